@@ -0,0 +1,103 @@
+# allocation.py - Continuous portfolio weights under the CSP portfolio constraints
+import numpy as np
+from scipy.optimize import linprog
+
+from portfolio_solver import liquidity_ratio
+
+# Weights below this are treated as not held
+WEIGHT_TOL = 1e-9
+
+
+def _solve_lp(score, returns, risks, high, support, lower, upper,
+              max_risk, min_return, ratio):
+    """Maximize score . w over ``support`` (other weights fixed at 0)"""
+    n = len(score)
+    # Rows: weighted risk <= max_risk, weighted return >= min_return,
+    # High-liquidity weight >= ratio (with the weights summing to 1)
+    A_ub = np.vstack((risks[support], -returns[support], ratio - high[support]))
+    b_ub = np.array([max_risk, -min_return, 0.0])
+    A_eq = np.ones((1, len(support)))
+    result = linprog(-score[support], A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=[1.0],
+                     bounds=np.column_stack((lower[support], upper[support])),
+                     method='highs')
+    if result.status != 0:
+        return None, result.message
+    weights = np.zeros(n)
+    weights[support] = np.clip(result.x, 0.0, None)
+    return weights, result.message
+
+
+def optimize_weights(returns, risks, high, max_risk, min_return, max_positions=None,
+                     ratio=0.0, max_weight=1.0, min_weight=0.0):
+    """Fully invested long-only weights maximizing ``w . (return - risk)``
+
+    Risk and return are weight-averaged per asset, so every constraint is
+    linear and the problem is a single LP (HiGHS), polynomial in the number
+    of assets. ``max_weight`` may be a scalar or a per-asset array; assets
+    that are held get at least ``min_weight``. At most ``max_positions``
+    assets are held: an LP vertex is already sparse (only a handful of
+    weights sit strictly between their bounds), and when it still holds
+    too many assets the largest positions are kept and the LP is re-solved
+    on them. That step is a heuristic, so it can report infeasibility where
+    an exact mixed-integer model would find a portfolio.
+
+    Returns ``(weights, message)``; ``weights`` is None when infeasible.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    risks = np.asarray(risks, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    n = len(returns)
+    if n == 0:
+        return None, "No assets"
+    upper = np.broadcast_to(np.asarray(max_weight, dtype=np.float64), (n,)).copy()
+    lower = np.zeros(n)
+    score = returns - risks
+
+    weights, message = _solve_lp(score, returns, risks, high, np.arange(n), lower, upper,
+                                 max_risk, min_return, ratio)
+    if weights is None:
+        return None, message
+
+    held = np.flatnonzero(weights > WEIGHT_TOL)
+    too_many = max_positions is not None and len(held) > max_positions
+    too_small = min_weight > 0 and np.any(weights[held] < min_weight)
+    if too_many or too_small:
+        if too_many:
+            # Largest weights first, better score breaks ties
+            order = np.lexsort((-score[held], -weights[held]))
+            held = np.sort(held[order[:max_positions]])
+        lower[held] = min(min_weight, upper[held].min())
+        weights, message = _solve_lp(score, returns, risks, high, held, lower, upper,
+                                     max_risk, min_return, ratio)
+    return weights, message
+
+
+def allocate(strategies, max_risk, min_return, max_count, liquidity_mix,
+             max_weight=1.0, min_weight=0.0):
+    """Continuous counterpart of PortfolioProblem for ``strategies`` dicts
+
+    Takes the same constraint values as the 0/1 solver, with max_count as
+    the maximum number of positions and ``liquidity_mix=None`` for no
+    High-liquidity requirement. Returns None when infeasible,
+    otherwise the weights by name (held positions only, largest first)
+    and the weighted return, risk and High-liquidity share.
+    """
+    names = [s["name"] for s in strategies]
+    returns = np.array([s["return"] for s in strategies], dtype=np.float64)
+    risks = np.array([s["risk"] for s in strategies], dtype=np.float64)
+    high = np.array([s["liquidity"] == "High" for s in strategies], dtype=np.float64)
+
+    weights, _ = optimize_weights(returns, risks, high, max_risk, min_return, max_count,
+                                  liquidity_ratio(liquidity_mix) if liquidity_mix else 0.0,
+                                  max_weight, min_weight)
+    if weights is None:
+        return None
+    held = np.flatnonzero(weights > WEIGHT_TOL)
+    held = held[np.argsort(-weights[held], kind='stable')]
+    return {
+        "weights": {names[i]: float(weights[i]) for i in held},
+        "expected_return": float(weights @ returns),
+        "risk": float(weights @ risks),
+        "high_liquidity_share": float(weights @ high),
+        "positions": len(held),
+    }
@@ -0,0 +1,169 @@
+# backtest.py - Walk-forward evaluation of the regime signal + strategy ranking
+import copy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from hmmlearn import hmm
+
+from data_cache import load_dataset
+from features import build_feature_matrix
+from regime import regime_kind, regime_names, regime_ranks
+from strategy_scoring import DEFAULT_CONSTRAINTS
+from strategy_store import StrategyStore
+
+
+def _is_valid(model):
+    return all(np.isfinite(p).all() for p in
+               (model.startprob_, model.transmat_, model.means_, model._covars_))
+
+
+def _fit_window(window, previous, n_components, covariance_type, n_iter, refit_iter,
+                random_state):
+    """Warm-started EM from ``previous`` with a cold fit as fallback"""
+    if previous is not None:
+        model = copy.deepcopy(previous)
+        model.init_params = ''
+        model.n_iter = refit_iter
+        try:
+            model.fit(window)
+            if _is_valid(model):
+                return model
+        except (ValueError, np.linalg.LinAlgError):
+            pass
+
+    model = hmm.GaussianHMM(n_components=n_components, covariance_type=covariance_type,
+                            n_iter=n_iter, random_state=random_state)
+    try:
+        model.fit(window)
+    except (ValueError, np.linalg.LinAlgError):
+        return None
+    return model if _is_valid(model) else None
+
+
+def walk_forward(data, graph, features=('return',), train_window=500, step=20,
+                 n_components=3, covariance_type='diag', n_iter=100, refit_iter=10,
+                 price_col='Close', constraints=DEFAULT_CONSTRAINTS, random_state=0):
+    """Slide a training window over the history and record each decision
+
+    The first window is fitted from scratch; every later window starts EM
+    from the previous window's parameters and runs at most ``refit_iter``
+    iterations, falling back to a cold fit if that degenerates. At each
+    step the regime for the next period is predicted from the filtered
+    state at the end of the window, the strategies in ``graph`` are ranked
+    for it, and the realized return over the next ``step`` observations is
+    recorded. ``timed_return`` holds the market return when the predicted
+    regime is not Bearish (cash otherwise).
+    """
+    X, valid = build_feature_matrix(data, features, price_col=price_col)
+    rows_of_obs = np.flatnonzero(valid)
+    prices = np.asarray(data[price_col], dtype=np.float64)
+    dates = data['Date'].to_numpy() if 'Date' in data.columns else rows_of_obs
+    names = regime_names(n_components)
+    store = StrategyStore.from_graph(graph)
+
+    records = []
+    model = None
+    for end in range(train_window, len(X) - step + 1, step):
+        window = X[end - train_window:end]
+        start = time.perf_counter()
+        model = _fit_window(window, model, n_components, covariance_type, n_iter,
+                            refit_iter, random_state)
+        fit_time = time.perf_counter() - start
+        if model is None:
+            continue
+
+        # Filtered state at the window end, pushed one step through the chain
+        filtered = model.predict_proba(window)[-1]
+        next_state = int(np.argmax(filtered @ model.transmat_))
+        regime = int(regime_ranks(model)[next_state])
+        market = regime_kind(regime, n_components)
+
+        ranked, _ = store.rank(market, constraints, top_n=1)
+        n_feasible = int(np.count_nonzero(store.feasible_mask(constraints)))
+        top = store.names[ranked[0]] if len(ranked) else None
+
+        now_row = rows_of_obs[end - 1]
+        next_row = rows_of_obs[end + step - 1]
+        realized = prices[next_row] / prices[now_row] - 1
+
+        records.append({
+            'date': dates[now_row],
+            'regime': regime,
+            'market_state': names[regime],
+            'top_strategy': top,
+            'n_feasible': n_feasible,
+            'realized_return': realized,
+            'timed_return': realized if market != 'Bearish' else 0.0,
+            'log_likelihood': model.score(window),
+            'fit_time': fit_time,
+            'iterations': model.monitor_.iter,
+        })
+
+    return pd.DataFrame(records)
+
+
+def summarize(results):
+    """Headline numbers for a walk_forward result table"""
+    if results.empty:
+        return {'steps': 0}
+    directional = results[results['market_state'].isin(['Bearish', 'Bullish'])]
+    hits = np.sign(directional['realized_return']) == np.where(
+        directional['market_state'] == 'Bullish', 1, -1)
+    return {
+        'steps': len(results),
+        'buy_and_hold': float(np.prod(1 + results['realized_return']) - 1),
+        'regime_timed': float(np.prod(1 + results['timed_return']) - 1),
+        'hit_rate': float(hits.mean()) if len(hits) else np.nan,
+        'mean_fit_time': float(results['fit_time'].mean()),
+        'mean_iterations': float(results['iterations'].mean()),
+    }
+
+
+def _walk_forward_ticker(ticker, data, graph, kwargs):
+    try:
+        results = walk_forward(data, graph, **kwargs)
+        results.insert(0, 'ticker', ticker)
+        return ticker, results, None
+    except Exception as e:
+        return ticker, None, f"{type(e).__name__}: {e}"
+
+
+def walk_forward_universe(universe, graph, processes=None, **kwargs):
+    """Run walk_forward for every ticker in ``{ticker: DataFrame}`` in parallel
+
+    Returns ``(results, errors)``: one concatenated table and a
+    ``{ticker: message}`` dict for tickers that failed.
+    """
+    tables, errors = [], {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_walk_forward_ticker, ticker, data, graph, kwargs)
+                   for ticker, data in universe.items()]
+        for future in futures:
+            ticker, results, error = future.result()
+            if error:
+                errors[ticker] = error
+            else:
+                tables.append(results)
+    results = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    return results, errors
+
+
+def main():
+    from main2 import FixedFinancialOptimizer
+
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "Yahoo_Finance_2018_2023.csv"
+    optimizer = FixedFinancialOptimizer()
+    graph = optimizer.build_optimization_network()
+
+    print("\n📈 WALK-FORWARD BACKTEST")
+    print("========================")
+    results = walk_forward(load_dataset(file_path), graph)
+    for key, value in summarize(results).items():
+        print(f"   {key}: {value:.4f}" if isinstance(value, float) else f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# batch_hmm.py - Forward/backward/Viterbi over many equal-length windows at once
+import numpy as np
+
+from regime import full_covariances
+
+
+def sliding_windows(X, window, step=1):
+    """Stack overlapping windows of X (T, D) into a (B, window, D) view"""
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    if len(X) < window:
+        return np.empty((0, window, X.shape[1]))
+    windows = np.lib.stride_tricks.sliding_window_view(X, window, axis=0)
+    # sliding_window_view puts the window axis last: (B, D, window)
+    return windows[::step].transpose(0, 2, 1)
+
+
+def _logsumexp(a, axis):
+    peak = np.max(a, axis=axis, keepdims=True)
+    peak = np.where(np.isfinite(peak), peak, 0.0)
+    with np.errstate(divide='ignore'):
+        out = np.log(np.sum(np.exp(a - peak), axis=axis, keepdims=True)) + peak
+    return np.squeeze(out, axis=axis)
+
+
+class BatchHMMEngine:
+    """Log-space HMM inference for a batch of sequences with a fitted GaussianHMM
+
+    All methods take a (batch, time, features) array and loop only over the
+    time axis; each step is a NumPy operation over the whole batch. State
+    indices are the model's raw indices (see ``regime.regime_ranks``).
+    """
+
+    def __init__(self, model):
+        covars = full_covariances(model)
+        chol = np.linalg.cholesky(covars)
+        n_features = covars.shape[1]
+        with np.errstate(divide='ignore'):
+            self.log_startprob = np.log(model.startprob_)
+            self.log_transmat = np.log(model.transmat_)
+        self.means = np.asarray(model.means_, dtype=np.float64)
+        self.inv_chol = np.linalg.inv(chol)
+        self.log_norm = (-0.5 * n_features * np.log(2 * np.pi)
+                         - np.log(np.diagonal(chol, axis1=1, axis2=2)).sum(axis=1))
+
+    def _as_batch(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 2:
+            X = X[:, :, None]
+        if X.ndim != 3:
+            raise ValueError("Expected a (batch, time, features) array")
+        return X
+
+    def log_emissions(self, X):
+        """Gaussian log-densities, shape (B, T, K)"""
+        X = self._as_batch(X)
+        diff = X[:, :, None, :] - self.means  # (B, T, K, D)
+        z = np.einsum('kde,btke->btkd', self.inv_chol, diff)
+        return self.log_norm - 0.5 * np.einsum('btkd,btkd->btk', z, z)
+
+    def _forward(self, log_b):
+        log_alpha = np.empty_like(log_b)
+        log_alpha[:, 0] = self.log_startprob + log_b[:, 0]
+        for t in range(1, log_b.shape[1]):
+            log_alpha[:, t] = _logsumexp(log_alpha[:, t - 1, :, None] + self.log_transmat,
+                                         axis=1) + log_b[:, t]
+        return _logsumexp(log_alpha[:, -1], axis=1), log_alpha
+
+    def forward(self, X):
+        """Return (log_likelihood (B,), log_alpha (B, T, K))"""
+        return self._forward(self.log_emissions(X))
+
+    def backward(self, log_b):
+        """log_beta (B, T, K) for precomputed emissions"""
+        log_beta = np.zeros_like(log_b)
+        for t in range(log_b.shape[1] - 2, -1, -1):
+            log_beta[:, t] = _logsumexp(self.log_transmat + (log_b[:, t + 1] + log_beta[:, t + 1])[:, None, :],
+                                        axis=2)
+        return log_beta
+
+    def score(self, X):
+        """Log-likelihood of every window"""
+        return self.forward(X)[0]
+
+    def posteriors(self, X):
+        """Return (log_likelihood (B,), state posteriors (B, T, K))"""
+        log_b = self.log_emissions(X)
+        log_likelihood, log_alpha = self._forward(log_b)
+        log_gamma = log_alpha + self.backward(log_b) - log_likelihood[:, None, None]
+        return log_likelihood, np.exp(log_gamma)
+
+    def viterbi(self, X):
+        """Return (best path log-probability (B,), state paths (B, T))"""
+        log_b = self.log_emissions(X)
+        n_batch, n_time, n_states = log_b.shape
+        backpointers = np.empty((n_batch, n_time, n_states), dtype=np.intp)
+        delta = self.log_startprob + log_b[:, 0]
+        for t in range(1, n_time):
+            candidates = delta[:, :, None] + self.log_transmat  # (B, from, to)
+            backpointers[:, t] = np.argmax(candidates, axis=1)
+            delta = np.take_along_axis(candidates, backpointers[:, t][:, None, :], axis=1)[:, 0] + log_b[:, t]
+
+        paths = np.empty((n_batch, n_time), dtype=np.intp)
+        paths[:, -1] = np.argmax(delta, axis=1)
+        for t in range(n_time - 1, 0, -1):
+            paths[:, t - 1] = np.take_along_axis(backpointers[:, t], paths[:, t, None], axis=1)[:, 0]
+        return delta.max(axis=1), paths
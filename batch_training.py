@@ -0,0 +1,190 @@
+# batch_training.py - Regime models for a whole ticker universe on a process pool
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_cache import load_dataset
+from features import build_feature_matrix
+from model_store import HMMModelStore, fit_hmm_cached
+from regime import OnlineRegimeFilter
+
+RESULT_COLUMNS = ['ticker', 'n_obs', 'current_state', 'market_state',
+                  'log_likelihood', 'fit_time', 'cached', 'error']
+
+
+def load_universe(file_path, ticker_col='Ticker'):
+    """Split a (long-format) dataset into ``{ticker: DataFrame}``
+
+    Files without a ticker column are treated as a single series named
+    after the file.
+    """
+    df = load_dataset(file_path)
+    if ticker_col not in df.columns:
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        return {name: df}
+    return {ticker: group.reset_index(drop=True)
+            for ticker, group in df.groupby(ticker_col, sort=False)}
+
+
+def _as_frame(series, price_col):
+    if isinstance(series, pd.DataFrame):
+        return series
+    return pd.DataFrame({price_col: np.asarray(series, dtype=np.float64)})
+
+
+def fit_ticker(ticker, series, settings):
+    """Fit one ticker's HMM; never raises, errors are reported in the row"""
+    row = dict.fromkeys(RESULT_COLUMNS)
+    row.update(ticker=ticker, cached=False)
+    start = time.perf_counter()
+    try:
+        price_col = settings['price_col']
+        X, _ = build_feature_matrix(_as_frame(series, price_col), settings['features'],
+                                    price_col=price_col)
+        row['n_obs'] = len(X)
+        if len(X) < 10 * settings['n_components']:
+            raise ValueError(f"not enough data ({len(X)} observations)")
+
+        store = HMMModelStore(settings['store_dir']) if settings['store_dir'] else None
+        model, cached = fit_hmm_cached(X,
+                                       n_components=settings['n_components'],
+                                       covariance_type=settings['covariance_type'],
+                                       n_iter=settings['n_iter'],
+                                       features=settings['features'],
+                                       store=store)
+        tracker = OnlineRegimeFilter(model).prime(X)
+        row.update(current_state=tracker.regime,
+                   market_state=tracker.label,
+                   log_likelihood=model.score(X),
+                   cached=cached)
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['fit_time'] = time.perf_counter() - start
+    return row
+
+
+# Seconds between checks of the running tickers against the timeout
+POLL_INTERVAL = 0.05
+
+# Shared per-task start times (time.time(), 0 = not started), set once per worker
+_STARTED = None
+
+
+def _init_worker(started):
+    global _STARTED
+    _STARTED = started
+    # Load hmmlearn here so its import is not charged to the first ticker's timeout
+    import hmmlearn.hmm
+
+
+def _fit_task(i, ticker, series, settings):
+    _STARTED[i] = time.time()
+    return fit_ticker(ticker, series, settings)
+
+
+def _timeout_row(ticker, timeout):
+    row = dict.fromkeys(RESULT_COLUMNS)
+    row.update(ticker=ticker, cached=False, fit_time=float(timeout),
+               error=f"TimeoutError: exceeded {timeout}s")
+    return row
+
+
+def _run_pool(tasks, settings, processes, timeout, rows):
+    """Fit ``tasks`` (``{i: (ticker, series)}``) into ``rows[i]`` on one pool
+
+    Returns the tasks left over when every worker got stuck on a timed-out
+    ticker (they need a fresh pool), else an empty dict.
+    """
+    n_workers = processes or os.cpu_count() or 1
+    started = mp.Array('d', len(rows), lock=False)
+    pool = mp.Pool(processes=n_workers, maxtasksperchild=200,
+                   initializer=_init_worker, initargs=(started,))
+    try:
+        pending = {i: pool.apply_async(_fit_task, (i, ticker, series, settings))
+                   for i, (ticker, series) in tasks.items()}
+        overdue = {}
+        while pending:
+            now = time.time()
+            for i, result in list(pending.items()):
+                if result.ready():
+                    rows[i] = result.get()
+                    del pending[i]
+                elif timeout is not None and started[i] and now - started[i] > timeout:
+                    rows[i] = _timeout_row(tasks[i][0], timeout)
+                    overdue[i] = pending.pop(i)
+            overdue = {i: result for i, result in overdue.items() if not result.ready()}
+            if pending and len(overdue) >= n_workers:
+                return {i: tasks[i] for i in pending}
+            if pending:
+                time.sleep(POLL_INTERVAL)
+        return {}
+    finally:
+        # terminate() also stops workers stuck on timed-out tickers
+        pool.terminate()
+        pool.join()
+
+
+def train_universe(universe, features=('return',), n_components=3, covariance_type='diag',
+                   n_iter=100, price_col='Close', processes=None, timeout=300,
+                   store_dir=None):
+    """Fit one HMM per ticker across a process pool
+
+    ``universe`` maps ticker -> DataFrame (or a 1-D array of prices). A
+    ticker that raises is reported in the ``error`` column; one still
+    running ``timeout`` seconds after a worker picked it up is reported as
+    timed out (time spent queued does not count). Timed-out workers keep
+    their slot until the pool ends; when every worker is stuck that way the
+    pool is terminated and the remaining tickers go to a fresh one. A
+    timeout needs a worker process to abandon, so ``processes=1`` still
+    uses a one-worker pool unless ``timeout`` is None, which fits in this
+    process. Returns a DataFrame with one row per ticker (see ``RESULT_COLUMNS``), in
+    ``universe`` order.
+    """
+    settings = {
+        'features': tuple(features),
+        'n_components': n_components,
+        'covariance_type': covariance_type,
+        'n_iter': n_iter,
+        'price_col': price_col,
+        'store_dir': store_dir,
+    }
+
+    if processes == 1 and timeout is None:
+        rows = [fit_ticker(ticker, series, settings) for ticker, series in universe.items()]
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+    rows = [None] * len(universe)
+    tasks = dict(enumerate(universe.items()))
+    while tasks:
+        tasks = _run_pool(tasks, settings, processes, timeout, rows)
+
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def main():
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "Yahoo_Finance_2018_2023.csv"
+
+    print("🚀 MULTI-TICKER REGIME TRAINING")
+    print("===============================")
+
+    try:
+        universe = load_universe(file_path)
+    except FileNotFoundError:
+        print(f"❌ FILE NOT FOUND: {file_path}")
+        return
+
+    print(f"📊 Tickers: {len(universe)}")
+    start = time.perf_counter()
+    results = train_universe(universe)
+    elapsed = time.perf_counter() - start
+
+    print(results.to_string(index=False))
+    print(f"\n✅ Trained {results['error'].isna().sum()}/{len(results)} tickers in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
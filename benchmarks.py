@@ -0,0 +1,413 @@
+# benchmarks.py - Stage timings of the optimization pipeline across data and universe sizes
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from features import build_feature_matrix
+from model_store import HMMModelStore
+from portfolio_index import INDEX_MAX_STRATEGIES, PortfolioFrontierIndex
+from portfolio_solver import PortfolioProblem
+
+RESULTS_DIR = 'benchmark_results'
+LATEST_RESULTS = os.path.join(RESULTS_DIR, 'latest.json')
+
+# rows: bars of one ticker (loading, returns, HMM, whole pipeline)
+# tickers: universe size (correlation graph, path finding)
+# strategies: CSP problem size
+DEFAULT_SWEEP = {
+    'rows': [1_000, 10_000, 100_000],
+    'tickers': [50, 200, 800],
+    'strategies': [8, 12, 16, 20],
+}
+QUICK_SWEEP = {
+    'rows': [500, 2_000, 8_000],
+    'tickers': [20, 60, 180],
+    'strategies': [6, 9, 12],
+}
+
+# Writing .xlsx through openpyxl is slow, so Excel loading stops here
+EXCEL_MAX_ROWS = 10_000
+TICKER_BARS = 250
+CSP_CONSTRAINTS = {'max_risk': 0.6, 'min_return': 0.10, 'liquidity_mix': 'Balanced'}
+
+# Import-time budgets (seconds, best of fresh interpreters) for --startup
+STARTUP_BUDGETS = {'main1': 0.6, 'main2': 0.6, 'gui_app': 0.6}
+# Heavy libraries that must wait for the stage that uses them
+LAZY_MODULES = ('pandas', 'scipy', 'networkx', 'hmmlearn', 'sklearn', 'matplotlib')
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Swallow the pipeline's progress prints while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _optimizer(store_dir):
+    with _quiet():
+        from main2 import FixedFinancialOptimizer
+        optimizer = FixedFinancialOptimizer()
+    # A fresh store per measurement, so every HMM is really fitted
+    optimizer.model_store = HMMModelStore(tempfile.mkdtemp(dir=store_dir))
+    return optimizer
+
+
+def measure(run, setup=None, repeat=3, budget=10.0):
+    """Wall times of ``run(setup())``; stops repeating once ``budget`` seconds are spent"""
+    times = []
+    while len(times) < repeat:
+        state = setup() if setup is not None else None
+        with _quiet():
+            start = time.perf_counter()
+            run(state)
+            times.append(time.perf_counter() - start)
+        if sum(times) > budget:
+            break
+    return times
+
+
+def _record(results, stage, axis, size, times):
+    entry = results.setdefault(stage, {'axis': axis, 'sizes': [], 'seconds': [], 'runs': []})
+    entry['sizes'].append(size)
+    entry['seconds'].append(min(times))
+    entry['runs'].append(times)
+    print(f"   {stage:<20} {axis}={size:<8,} {min(times):9.4f}s")
+
+
+def bench_rows(results, rows, workdir, repeat):
+    """Loading, returns, HMM fit/predict and the full pipeline on one ticker"""
+    from data_cache import cache_dir_for
+    from synthetic_data import generate_market, write_market
+    
+    csv_path = os.path.join(workdir, f'rows_{rows}.csv')
+    write_market(csv_path, 1, rows, seed=rows, cache=False, freq='h')
+
+    def cold_cache(path):
+        shutil.rmtree(cache_dir_for(path), ignore_errors=True)
+        return _optimizer(workdir)
+
+    _record(results, 'load_csv', 'rows', rows,
+            measure(lambda opt: opt.load_data_fixed(csv_path), lambda: cold_cache(csv_path), repeat))
+    _record(results, 'load_cached', 'rows', rows,
+            measure(lambda opt: opt.load_data_fixed(csv_path), lambda: _optimizer(workdir), repeat))
+
+    if rows <= EXCEL_MAX_ROWS and _has_module('openpyxl'):
+        xlsx_path = os.path.join(workdir, f'rows_{rows}.xlsx')
+        generate_market(1, rows, seed=rows, freq='h').to_excel(xlsx_path, index=False)
+        _record(results, 'load_excel', 'rows', rows,
+                measure(lambda opt: opt.load_data_fixed(xlsx_path), lambda: cold_cache(xlsx_path),
+                        repeat))
+
+    optimizer = _optimizer(workdir)
+    with _quiet():
+        data = optimizer.load_data_fixed(csv_path)
+    _record(results, 'returns', 'rows', rows,
+            measure(lambda _: build_feature_matrix(data, ('return',), price_col='Close'),
+                    repeat=repeat))
+
+    def with_data():
+        opt = _optimizer(workdir)
+        opt.data = data
+        return opt
+
+    _record(results, 'hmm_fit_predict', 'rows', rows,
+            measure(lambda opt: opt.train_fixed_hmm(), with_data, repeat))
+    with _quiet():
+        optimizer.train_fixed_hmm()
+    _record(results, 'hmm_predict', 'rows', rows,
+            measure(lambda _: optimizer.hmm_model.predict(optimizer.observations), repeat=repeat))
+
+    _record(results, 'pipeline', 'rows', rows,
+            measure(lambda opt: opt.run_complete_optimization(csv_path),
+                    lambda: _optimizer(workdir), repeat))
+
+
+def bench_tickers(results, n_tickers, workdir, repeat):
+    """Correlation graph construction and path finding over a ticker universe"""
+    from synthetic_data import generate_market
+    
+    market = generate_market(n_tickers, TICKER_BARS, seed=n_tickers)
+    universe = {ticker: group.reset_index(drop=True)
+                for ticker, group in market.groupby('Ticker', sort=False, observed=True)}
+    tickers = list(universe)
+    sources, targets = tickers[:5], tickers[-5:]
+
+    optimizer = _optimizer(workdir)
+    _record(results, 'graph_build', 'tickers', n_tickers,
+            measure(lambda _: optimizer.build_correlation_network(universe, k=10), repeat=repeat))
+
+    def fresh_engine():
+        optimizer.path_engine = None
+        return optimizer
+
+    _record(results, 'path_finding', 'tickers', n_tickers,
+            measure(lambda opt: opt.find_optimal_paths_constrained(
+                start_nodes=sources, target_nodes=targets), fresh_engine, repeat))
+    _record(results, 'path_constrained', 'tickers', n_tickers,
+            measure(lambda opt: opt.find_optimal_paths_constrained(
+                max_steps=6, start_nodes=sources, target_nodes=targets), fresh_engine, repeat))
+
+
+def random_strategies(n, seed=0):
+    """Strategies shaped like gui_app.build_graph_models, with random attributes"""
+    rng = np.random.default_rng(seed)
+    liquidity = rng.choice(['High', 'Medium', 'Low'], size=n)
+    return [{'name': f'STRATEGY {i}', 'return': float(rng.uniform(0.03, 0.16)),
+             'risk': float(rng.uniform(0.1, 0.8)), 'liquidity': str(liquidity[i])}
+            for i in range(n)]
+
+
+def bench_strategies(results, n_strategies, repeat):
+    """The GUI's setup_csp_problem + solve_csp_constraints path"""
+    strategies = random_strategies(n_strategies, seed=n_strategies)
+    max_count = min(4, n_strategies)
+
+    def setup(_):
+        problem = PortfolioProblem(strategies, CSP_CONSTRAINTS['max_risk'],
+                                   CSP_CONSTRAINTS['min_return'], max_count,
+                                   CSP_CONSTRAINTS['liquidity_mix'])
+        index = (PortfolioFrontierIndex(strategies, depth=10)
+                 if n_strategies <= INDEX_MAX_STRATEGIES else None)
+        return problem, index
+
+    def solve(state):
+        problem, index = state
+        solutions = index.answer(problem, 10) if index is not None else problem.top_k(10)
+        return [problem.portfolio(solution) for solution in solutions]
+
+    _record(results, 'csp_setup', 'strategies', n_strategies, measure(setup, repeat=repeat))
+    problem_and_index = setup(None)
+    _record(results, 'csp_solve', 'strategies', n_strategies,
+            measure(solve, lambda: problem_and_index, repeat))
+
+
+# Runs in a fresh interpreter: import time of one module and the lazy libraries it pulled in
+_STARTUP_PROBE = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def startup_time(module, repeat=5):
+    """Best import time of ``module`` over ``repeat`` fresh interpreters, and the
+    ``LAZY_MODULES`` loaded by importing it"""
+    code = _STARTUP_PROBE.format(module=module, lazy=LAZY_MODULES)
+    times, loaded = [], []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                timeout=120, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(probe['seconds'])
+        loaded = probe['loaded']
+    return min(times), loaded
+
+
+def check_startup(budgets=None, repeat=5):
+    """Rows ``(module, seconds, budget, loaded, ok)``; a module fails when it is
+    over budget or imports any of ``LAZY_MODULES`` at startup"""
+    budgets = STARTUP_BUDGETS if budgets is None else budgets
+    rows = []
+    for module, budget in budgets.items():
+        seconds, loaded = startup_time(module, repeat)
+        rows.append((module, seconds, budget, loaded, seconds <= budget and not loaded))
+    return rows
+
+
+def print_startup(rows):
+    print(f"\n{'module':<12} {'import_s':>9} {'budget_s':>9}  eager heavy imports")
+    for module, seconds, budget, loaded, ok in rows:
+        print(f"{module:<12} {seconds:>9.3f} {budget:>9.2f}  {', '.join(loaded) or '-':<30} "
+              f"{'✅' if ok else '❌'}")
+
+
+def _has_module(name):
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def scaling_exponent(sizes, seconds):
+    """Slope of log(seconds) against log(size): ~1 linear, ~2 quadratic"""
+    sizes, seconds = np.asarray(sizes, dtype=float), np.asarray(seconds, dtype=float)
+    keep = seconds > 0
+    if keep.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(sizes[keep]), np.log(seconds[keep]), 1)[0])
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(sweep=None, repeat=3):
+    """Run every stage over ``sweep`` and return the results dict"""
+    sweep = DEFAULT_SWEEP if sweep is None else sweep
+    stages = {}
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    try:
+        for rows in sweep['rows']:
+            print(f"📊 rows={rows:,}")
+            bench_rows(stages, rows, workdir, repeat)
+        for n_tickers in sweep['tickers']:
+            print(f"🕸️ tickers={n_tickers:,}")
+            bench_tickers(stages, n_tickers, workdir, repeat)
+        for n_strategies in sweep['strategies']:
+            print(f"⚡ strategies={n_strategies}")
+            bench_strategies(stages, n_strategies, repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for entry in stages.values():
+        entry['exponent'] = scaling_exponent(entry['sizes'], entry['seconds'])
+    return {'meta': _metadata(), 'sweep': sweep, 'repeat': repeat, 'stages': stages}
+
+
+def save_results(results, directory=RESULTS_DIR):
+    """Write a timestamped JSON file and refresh ``latest.json``"""
+    os.makedirs(directory, exist_ok=True)
+    stamp = results['meta']['timestamp'].replace(':', '').replace('-', '')
+    path = os.path.join(directory, f"bench_{stamp}.json")
+    for target in (path, os.path.join(directory, 'latest.json')):
+        with open(target, 'w') as f:
+            json.dump(results, f, indent=2)
+    return path
+
+
+def load_results(path=LATEST_RESULTS):
+    """Results dict from a JSON file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current):
+    """Rows ``(stage, axis, size, baseline_s, current_s, ratio)`` for shared points"""
+    rows = []
+    for stage, entry in current['stages'].items():
+        old = baseline['stages'].get(stage)
+        if old is None:
+            continue
+        old_times = dict(zip(old['sizes'], old['seconds']))
+        for size, seconds in zip(entry['sizes'], entry['seconds']):
+            if size in old_times:
+                rows.append((stage, entry['axis'], size, old_times[size], seconds,
+                             seconds / old_times[size] if old_times[size] > 0 else float('inf')))
+    return rows
+
+
+def plot_scaling(results, path):
+    """Log-log time vs size curves, one panel per sweep axis"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    axes_names = sorted({entry['axis'] for entry in results['stages'].values()})
+    fig, axes = plt.subplots(1, len(axes_names), figsize=(5 * len(axes_names), 4), squeeze=False)
+    for ax, axis in zip(axes[0], axes_names):
+        for stage, entry in results['stages'].items():
+            if entry['axis'] != axis:
+                continue
+            exponent = entry['exponent']
+            label = stage if exponent is None else f"{stage} (~n^{exponent:.2f})"
+            ax.loglog(entry['sizes'], entry['seconds'], marker='o', label=label)
+        ax.set_xlabel(axis)
+        ax.set_ylabel('seconds (best of runs)')
+        ax.legend(fontsize=7)
+        ax.grid(True, which='both', alpha=0.3)
+    fig.suptitle(f"Benchmarks {results['meta']['timestamp']} ({results['meta']['commit']})")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+    return path
+
+
+def print_summary(results):
+    print(f"\n{'stage':<20} {'axis':<11} {'largest':>10} {'seconds':>10} {'exponent':>9}")
+    for stage, entry in results['stages'].items():
+        exponent = '-' if entry['exponent'] is None else f"{entry['exponent']:.2f}"
+        print(f"{stage:<20} {entry['axis']:<11} {entry['sizes'][-1]:>10,} "
+              f"{entry['seconds'][-1]:>10.4f} {exponent:>9}")
+
+
+def print_comparison(baseline, current):
+    print(f"\n{'stage':<20} {'size':>10} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for stage, _, size, old, new, ratio in compare_results(baseline, current):
+        flag = '🔺' if ratio > 1.1 else ('🔻' if ratio < 0.9 else '  ')
+        print(f"{stage:<20} {size:>10,} {old:>10.4f} {new:>10.4f} {ratio:>6.2f}x {flag}")
+
+
+def main():
+    # usage: python benchmarks.py [--quick] [--repeat N]
+    #        python benchmarks.py --compare BASELINE.json [CURRENT.json]
+    #        python benchmarks.py --startup [--repeat N]   (exit 1 on a regression)
+    args = sys.argv[1:]
+    if '--startup' in args:
+        print("⏱️ STARTUP BENCHMARK")
+        print("===================")
+        rows = check_startup(repeat=int(args[args.index('--repeat') + 1]) if '--repeat' in args else 5)
+        print_startup(rows)
+        if not all(ok for *_, ok in rows):
+            print("\n❌ Startup regression: import over budget or heavy library loaded eagerly")
+            sys.exit(1)
+        print("\n✅ Startup within budget")
+        return
+    
+    if '--compare' in args:
+        paths = args[args.index('--compare') + 1:]
+        baseline = load_results(paths[0])
+        current = load_results(paths[1] if len(paths) > 1 else LATEST_RESULTS)
+        if baseline is None or current is None:
+            print("❌ Results file not found")
+            return
+        print_comparison(baseline, current)
+        return
+
+    repeat = int(args[args.index('--repeat') + 1]) if '--repeat' in args else 3
+    sweep = QUICK_SWEEP if '--quick' in args else DEFAULT_SWEEP
+
+    print("⏱️ PIPELINE BENCHMARKS")
+    print("=====================")
+    previous = load_results()
+    results = run_benchmarks(sweep, repeat)
+    path = save_results(results)
+    print_summary(results)
+    if _has_module('matplotlib'):
+        print(f"\n📈 Scaling curves: {plot_scaling(results, path[:-len('.json')] + '.png')}")
+    if previous is not None:
+        print_comparison(previous, results)
+    print(f"\n✅ Results saved to '{path}' (and {LATEST_RESULTS})")
+
+
+if __name__ == "__main__":
+    main()
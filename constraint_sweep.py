@@ -0,0 +1,214 @@
+# constraint_sweep.py - Optimal portfolios and strategy rankings over constraint grids
+import itertools
+import multiprocessing as mp
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from correlation_graph import LIQUIDITY_LEVELS
+from portfolio_index import INDEX_MAX_STRATEGIES, PortfolioFrontierIndex
+from portfolio_solver import DEFAULT_STRATEGIES, LIQUIDITY_SCORES, PortfolioProblem
+from strategy_store import HIGH_LIQUIDITY, MARKETS
+
+GRID_COLUMNS = ['scenario', 'max_risk', 'min_return', 'max_strategies', 'liquidity_mix']
+PORTFOLIO_COLUMNS = GRID_COLUMNS + ['rank', 'strategies', 'n_strategies', 'total_return',
+                                    'total_risk', 'score', 'liquidity_score']
+RANKING_COLUMNS = ['scenario', 'market', 'max_risk', 'min_return', 'liquidity', 'rank',
+                   'strategy', 'score']
+
+# Default committee grid: 19 x 10 x 9 x 3 = 5130 scenarios
+# Cap on (scenarios x strategies) elements per chunk of the rankings sweep
+RANKING_CHUNK_ELEMENTS = 1 << 22
+
+DEFAULT_GRID = {
+    'max_risk': np.round(np.arange(0.2, 2.01, 0.1), 2),
+    'min_return': np.round(np.arange(0.05, 0.51, 0.05), 2),
+    'max_strategies': range(1, 10),
+    'liquidity_mix': ('Conservative', 'Balanced', 'Aggressive'),
+}
+
+
+def constraint_grid(max_risk, min_return, max_strategies, liquidity_mix):
+    """Every combination of the given values, one row per numbered scenario"""
+    grid = pd.DataFrame(list(itertools.product(max_risk, min_return, max_strategies, liquidity_mix)),
+                        columns=GRID_COLUMNS[1:])
+    grid.insert(0, 'scenario', np.arange(len(grid)))
+    return grid
+
+
+# Per-process sweep state, set once per worker by the pool initializer
+_SWEEP = {}
+
+
+def _init_worker(strategies, index):
+    """Receive the strategies and the precomputed frontier index once per worker"""
+    _SWEEP['strategies'] = strategies
+    _SWEEP['index'] = index
+    _SWEEP['names'] = np.array([s["name"] for s in strategies], dtype=object)
+    _SWEEP['liquidity_score'] = np.array([LIQUIDITY_SCORES.get(s["liquidity"], 1)
+                                          for s in strategies])
+
+
+def _index_rows(cell, k):
+    index = _SWEEP['index']
+    positions = index.positions(*cell[1:], k=k)
+    names, liquidity_score = _SWEEP['names'], _SWEEP['liquidity_score']
+    bits = np.arange(len(names))
+    rows = []
+    for rank, position in enumerate(positions, 1):
+        chosen = ((int(index.masks[position]) >> bits) & 1) == 1
+        rows.append(cell + (rank, ' + '.join(names[chosen]), int(index.count[position]),
+                            float(index.total_return[position]), float(index.total_risk[position]),
+                            float(index.score[position]), int(liquidity_score[chosen].sum())))
+    return rows
+
+
+def _problem_rows(cell, k):
+    problem = PortfolioProblem(_SWEEP['strategies'], *cell[1:])
+    rows = []
+    for rank, solution in enumerate(problem.top_k(k), 1):
+        portfolio = problem.portfolio(solution)
+        rows.append(cell + (rank, ' + '.join(portfolio['strategies']),
+                            len(portfolio['strategies']), portfolio['total_return'],
+                            portfolio['total_risk'],
+                            portfolio['total_return'] - portfolio['total_risk'],
+                            portfolio['liquidity_score']))
+    return rows
+
+
+def _solve_cells(cells, k):
+    """Result rows for a chunk of scenarios; infeasible ones get a rank-0 row"""
+    solve = _index_rows if _SWEEP['index'] is not None else _problem_rows
+    rows = []
+    for cell in cells:
+        cell_rows = solve(cell, k)
+        rows.extend(cell_rows or [cell + (0, '', 0, np.nan, np.nan, np.nan, 0)])
+    return rows
+
+
+def sweep_portfolios(strategies=None, grid=None, k=10, processes=None, chunk_size=256):
+    """Top ``k`` portfolios for every scenario of ``grid`` (see constraint_grid)
+
+    This is the GUI's setup_csp_problem + solve_csp_constraints per cell.
+    Strategy sets small enough for a PortfolioFrontierIndex are indexed
+    once here and the index is handed to each worker by the pool
+    initializer, so a cell is only a range lookup plus a few masks; larger
+    sets are solved per cell with PortfolioProblem. Scenarios are sent in
+    chunks of ``chunk_size``; ``processes=1`` runs in this process.
+    Returns one table (``PORTFOLIO_COLUMNS``) with up to ``k`` rows per
+    scenario, best first; scenarios with no feasible portfolio have a
+    single row with rank 0.
+    """
+    strategies = list(DEFAULT_STRATEGIES if strategies is None else strategies)
+    grid = constraint_grid(**DEFAULT_GRID) if grid is None else grid
+    index = (PortfolioFrontierIndex(strategies, depth=max(k, 10))
+             if len(strategies) <= INDEX_MAX_STRATEGIES else None)
+
+    cells = [(int(s), float(r), float(m), int(c), str(mix)) for s, r, m, c, mix in
+             grid[GRID_COLUMNS].itertuples(index=False, name=None)]
+    chunks = [cells[i:i + chunk_size] for i in range(0, len(cells), chunk_size)]
+
+    if processes == 1 or len(chunks) <= 1:
+        _init_worker(strategies, index)
+        parts = [_solve_cells(chunk, k) for chunk in chunks]
+    else:
+        with mp.Pool(processes=processes, initializer=_init_worker,
+                     initargs=(strategies, index)) as pool:
+            parts = pool.starmap(_solve_cells, [(chunk, k) for chunk in chunks])
+
+    return pd.DataFrame([row for part in parts for row in part], columns=PORTFOLIO_COLUMNS)
+
+
+def sweep_strategy_rankings(store, max_risk, min_return, liquidity=LIQUIDITY_LEVELS,
+                            markets=MARKETS, top_n=None, chunk_size=4096,
+                            max_elements=RANKING_CHUNK_ELEMENTS):
+    """``constraint_aware_optimization`` rankings for every threshold combination
+
+    ``store`` is a StrategyStore. Feasibility and scores are computed for a
+    whole chunk of scenarios at once as (scenarios x strategies) arrays;
+    a chunk has at most ``chunk_size`` scenarios and ``max_elements``
+    array elements, so memory stays bounded for large stores. Ties keep
+    store order as in ``StrategyStore.rank``. Returns one table
+    (``RANKING_COLUMNS``) with every feasible strategy (or the ``top_n``
+    best) per scenario and market.
+    """
+    cells = pd.DataFrame(list(itertools.product(max_risk, min_return, liquidity)),
+                         columns=['max_risk', 'min_return', 'liquidity'])
+    required = np.array([LIQUIDITY_LEVELS.index(level) for level in cells['liquidity']])
+    scores = {market: store.scores(market) for market in MARKETS}
+    names = np.asarray(store.names, dtype=object)
+    chunk_size = max(1, min(chunk_size, max_elements // max(len(store), 1)))
+
+    tables = []
+    for start in range(0, len(cells), chunk_size):
+        part = slice(start, start + chunk_size)
+        feasible = ((store.max_risk[None, :] <= cells['max_risk'].to_numpy()[part, None]) &
+                    (store.expected_return[None, :] >= cells['min_return'].to_numpy()[part, None]) &
+                    ((store.liquidity[None, :] == required[part, None]) |
+                     (store.liquidity[None, :] == HIGH_LIQUIDITY)))
+        n_feasible = feasible.sum(axis=1)
+        limit = n_feasible if top_n is None else np.minimum(n_feasible, top_n)
+        for market in markets:
+            key = np.where(feasible, -scores[market][None, :], np.inf)
+            order = np.argsort(key, axis=1, kind='stable')
+            rank = np.arange(1, len(store) + 1)[None, :]
+            keep = rank <= limit[:, None]
+            scenario, position = np.nonzero(keep)
+            strategy = order[scenario, position]
+            scenario += start
+            tables.append(pd.DataFrame({
+                'scenario': scenario,
+                'market': market,
+                'max_risk': cells['max_risk'].to_numpy()[scenario],
+                'min_return': cells['min_return'].to_numpy()[scenario],
+                'liquidity': cells['liquidity'].to_numpy()[scenario],
+                'rank': position + 1,
+                'strategy': names[strategy],
+                'score': scores[market][strategy],
+            }, columns=RANKING_COLUMNS))
+
+    if not tables:
+        return pd.DataFrame(columns=RANKING_COLUMNS)
+    table = pd.concat(tables, ignore_index=True)
+    return table.sort_values(['scenario', 'market', 'rank'], kind='stable', ignore_index=True)
+
+
+def main():
+    # usage: python constraint_sweep.py [OUT.csv] [--processes N] [--rankings]
+    args = sys.argv[1:]
+    processes = int(args[args.index('--processes') + 1]) if '--processes' in args else None
+    paths = [a for i, a in enumerate(args)
+             if not a.startswith('--') and (i == 0 or args[i - 1] != '--processes')]
+    out_path = paths[0] if paths else 'constraint_sweep.csv'
+
+    print("🧮 CONSTRAINT SWEEP")
+    print("===================")
+    grid = constraint_grid(**DEFAULT_GRID)
+    print(f"📋 Scenarios: {len(grid):,} (max_risk x min_return x max_strategies x liquidity_mix)")
+
+    start = time.perf_counter()
+    results = sweep_portfolios(grid=grid, processes=processes)
+    elapsed = time.perf_counter() - start
+    results.to_csv(out_path, index=False)
+    feasible = results.loc[results['rank'] > 0, 'scenario'].nunique()
+    print(f"✅ {feasible:,}/{len(grid):,} scenarios feasible, {len(results):,} rows "
+          f"written to '{out_path}' in {elapsed:.2f}s")
+
+    if '--rankings' in args:
+        from strategy_store import StrategyStore
+        from main2 import FixedFinancialOptimizer
+
+        optimizer = FixedFinancialOptimizer()
+        store = StrategyStore.from_graph(optimizer.build_optimization_network())
+        rankings = sweep_strategy_rankings(store, DEFAULT_GRID['max_risk'],
+                                           DEFAULT_GRID['min_return'])
+        rankings_path = out_path[:-4] + '_rankings.csv' if out_path.endswith('.csv') \
+            else out_path + '_rankings.csv'
+        rankings.to_csv(rankings_path, index=False)
+        print(f"✅ {len(rankings):,} strategy rankings written to '{rankings_path}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# correlation_graph.py - Sparse (CSR) strategy/ticker graphs built from return correlations
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+LIQUIDITY_LEVELS = ('Low', 'Medium', 'High')
+CONSTRAINT_LEVELS = ('Low', 'Medium', 'High')
+TRADING_DAYS = 252
+
+
+class SparseStrategyGraph:
+    """Directed graph with per-node arrays and CSR edge matrices
+
+    Node ``i`` is ``nodes[i]``; ``expected_return``, ``max_risk`` and
+    ``liquidity`` (index into LIQUIDITY_LEVELS) are arrays over nodes.
+    ``transition_cost``, ``constraint_level`` (1 = Low .. 3 = High) and
+    ``weight`` are CSR matrices sharing one sparsity structure, so the
+    ``data`` arrays line up edge by edge.
+    """
+
+    def __init__(self, nodes, expected_return, max_risk, liquidity,
+                 transition_cost, constraint_level, weight):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.expected_return = np.asarray(expected_return, dtype=np.float64)
+        self.max_risk = np.asarray(max_risk, dtype=np.float64)
+        self.liquidity = np.asarray(liquidity, dtype=np.int8)
+        self.transition_cost = transition_cost.tocsr()
+        self.constraint_level = constraint_level.tocsr()
+        self.weight = weight.tocsr()
+
+        # The edge structure is fixed (update_edges only changes values), so
+        # edge lookups and in-edge lists are indexed once
+        n = len(self.nodes)
+        indices = self.transition_cost.indices
+        self.edge_source = np.repeat(np.arange(n), np.diff(self.transition_cost.indptr))
+        self._edge_keys = self.edge_source.astype(np.int64) * n + indices
+        # In-edges of node v: data positions in_edges[in_ptr[v]:in_ptr[v + 1]]
+        self.in_edges = np.argsort(indices, kind='stable')
+        self.in_ptr = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=n))))
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return self.transition_cost.nnz
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def neighbors(self, node):
+        i = self.index[node]
+        row = self.transition_cost
+        return [self.nodes[j] for j in row.indices[row.indptr[i]:row.indptr[i + 1]]]
+
+    def edge_positions(self, sources, targets):
+        """Positions in the CSR ``data`` arrays of the (source, target) index pairs"""
+        n = len(self.nodes)
+        keys = self._edge_keys
+        wanted = np.asarray(sources, dtype=np.int64) * n + np.asarray(targets, dtype=np.int64)
+        positions = np.searchsorted(keys, wanted)
+        found = positions < len(keys)
+        found[found] = keys[positions[found]] == wanted[found]
+        if not found.all():
+            raise KeyError("Edge not in graph")
+        return positions
+
+    def update_edges(self, edges, transition_cost=None, constraint_level=None):
+        """Change attributes of existing ``(source, target)`` edges in place
+
+        Returns ``(sources, targets, old_cost)`` as index arrays plus the
+        previous transition costs, for incremental path repair.
+        """
+        sources = np.array([self.index[u] for u, _ in edges], dtype=np.int64)
+        targets = np.array([self.index[v] for _, v in edges], dtype=np.int64)
+        positions = self.edge_positions(sources, targets)
+        old_cost = self.transition_cost.data[positions].copy()
+        if transition_cost is not None:
+            self.transition_cost.data[positions] = transition_cost
+        if constraint_level is not None:
+            levels = [CONSTRAINT_LEVELS.index(level) + 1 if isinstance(level, str) else level
+                      for level in np.atleast_1d(constraint_level)]
+            self.constraint_level.data[positions] = levels
+        return sources, targets, old_cost
+
+    def update_node(self, node, expected_return=None, max_risk=None, liquidity=None):
+        """Change a node's attributes in place"""
+        i = self.index[node]
+        if expected_return is not None:
+            self.expected_return[i] = expected_return
+        if max_risk is not None:
+            self.max_risk[i] = max_risk
+        if liquidity is not None:
+            self.liquidity[i] = LIQUIDITY_LEVELS.index(liquidity)
+
+    def strategies(self):
+        """Nodes as ``{"name", "return", "risk", "liquidity"}`` dicts for the solvers"""
+        return [{"name": node,
+                 "return": float(self.expected_return[i]),
+                 "risk": float(self.max_risk[i]),
+                 "liquidity": LIQUIDITY_LEVELS[self.liquidity[i]]}
+                for i, node in enumerate(self.nodes)]
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """Convert a graph built by ``FixedFinancialOptimizer`` (nx.DiGraph)"""
+        nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        data = [graph.nodes[node] for node in nodes]
+        rows, cols, costs, levels, weights = [], [], [], [], []
+        for source, target, attrs in graph.edges(data=True):
+            rows.append(index[source])
+            cols.append(index[target])
+            costs.append(attrs.get('transition_cost', 0.0))
+            levels.append(CONSTRAINT_LEVELS.index(attrs.get('constraint_level', 'High')) + 1)
+            weights.append(attrs.get('weight', 1.0))
+        shape = (len(nodes), len(nodes))
+
+        def matrix(values, dtype):
+            return sparse.csr_matrix((np.asarray(values, dtype=dtype), (rows, cols)), shape=shape)
+
+        return cls(nodes,
+                   [d.get('expected_return', 0.0) for d in data],
+                   [d.get('max_risk', 0.0) for d in data],
+                   [LIQUIDITY_LEVELS.index(d.get('liquidity', 'Medium')) for d in data],
+                   matrix(costs, np.float64), matrix(levels, np.int8), matrix(weights, np.float32))
+
+
+def returns_panel(universe, price_col='Close', date_col='Date'):
+    """Aligned daily returns (dates x tickers) from ``{ticker: DataFrame}``"""
+    prices = {}
+    for ticker, data in universe.items():
+        series = pd.Series(np.asarray(data[price_col], dtype=np.float64),
+                           index=data[date_col] if date_col in data.columns else None)
+        prices[ticker] = series[~series.index.duplicated()]
+    return pd.DataFrame(prices).sort_index().pct_change(fill_method=None).iloc[1:]
+
+
+def _standardize(returns):
+    """Columns scaled so that ``Z.T @ Z`` is the correlation matrix (float32)
+
+    Missing returns are set to the column mean, i.e. they contribute
+    nothing to the covariance; constant columns correlate with nothing.
+    """
+    R = np.asarray(returns, dtype=np.float32)
+    mean = np.nanmean(R, axis=0)
+    Z = np.where(np.isnan(R), 0.0, R - mean).astype(np.float32)
+    norm = np.sqrt(np.einsum('tn,tn->n', Z, Z))
+    Z /= np.where(norm > 0, norm, np.inf)
+    return Z
+
+
+def correlation_edges(returns, threshold=0.5, k=None, block_size=1024):
+    """Sparse correlation adjacency as a float32 CSR matrix
+
+    The correlation matrix is computed one block of rows at a time
+    (``block_size`` x N, float32), so the dense N x N matrix never exists.
+    Each row keeps the correlations >= ``threshold``, or with ``k`` given,
+    its ``k`` most correlated other tickers (still subject to
+    ``threshold``; pass ``threshold=-1`` for a plain kNN graph).
+    """
+    Z = _standardize(returns)
+    n = Z.shape[1]
+    rows, cols, values = [], [], []
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = Z[:, start:stop].T @ Z  # (b, N) correlations
+        local = np.arange(stop - start)
+        block[local, start + local] = -np.inf  # no self-loops
+        if k is not None and k < n - 1:
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            keep = np.zeros(block.shape, dtype=bool)
+            np.put_along_axis(keep, top, True, axis=1)
+            keep &= block >= threshold
+        else:
+            keep = block >= threshold
+        r, c = np.nonzero(keep)
+        rows.append(r + start)
+        cols.append(c)
+        values.append(np.clip(block[r, c], -1.0, 1.0))
+    rows, cols, values = (np.concatenate(parts) for parts in (rows, cols, values))
+    return sparse.csr_matrix((values, (rows, cols)), shape=(n, n), dtype=np.float32)
+
+
+def build_correlation_graph(returns, threshold=0.5, k=None, block_size=1024, volumes=None,
+                            min_cost=0.01, max_cost=0.05):
+    """SparseStrategyGraph over the columns of a returns DataFrame
+
+    Nodes are tickers with annualized mean return and volatility as
+    ``expected_return``/``max_risk``, and liquidity terciles of average
+    volume (``volumes``: per-ticker Series/array, Medium for all without
+    it). Edges come from ``correlation_edges``; ``weight`` is the
+    correlation, ``transition_cost`` falls linearly from ``max_cost`` at
+    correlation -1 to ``min_cost`` at +1 (switching between similar
+    assets is cheap), and ``constraint_level`` is Low/Medium/High for
+    moving into a High/Medium/Low liquidity ticker.
+    """
+    nodes = list(returns.columns)
+    R = returns.to_numpy(dtype=np.float64)
+    expected_return = np.nanmean(R, axis=0) * TRADING_DAYS
+    max_risk = np.nanstd(R, axis=0) * np.sqrt(TRADING_DAYS)
+
+    if volumes is None:
+        liquidity = np.full(len(nodes), 1, dtype=np.int8)
+    else:
+        volume = np.asarray(pd.Series(volumes).reindex(nodes), dtype=np.float64)
+        ranks = pd.Series(volume).rank(pct=True, method='average').fillna(0).to_numpy()
+        liquidity = np.minimum((ranks * 3).astype(np.int8), 2)
+
+    weight = correlation_edges(R, threshold=threshold, k=k, block_size=block_size)
+    cost = weight.copy().astype(np.float64)
+    cost.data = max_cost - (max_cost - min_cost) * (cost.data + 1) / 2
+    level = weight.copy().astype(np.int8)
+    level.data = (3 - liquidity[weight.indices]).astype(np.int8)
+    return SparseStrategyGraph(nodes, expected_return, max_risk, liquidity, cost, level, weight)
@@ -0,0 +1,262 @@
+# data_cache.py - Typed, memory-mappable columnar cache for the datasets
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+CACHE_SUFFIX = '.cache'
+MANIFEST = 'manifest.json'
+CACHE_VERSION = 1
+
+
+def cache_dir_for(source_path):
+    """Directory holding the cache for a CSV/Excel source file"""
+    return source_path + CACHE_SUFFIX
+
+
+def normalize_frame(df):
+    """Clean column names, parse dates, coerce numerics and sort ascending"""
+    df = df.copy()
+    df.columns = [col.replace('*', '').strip() for col in df.columns]
+
+    if 'Date' in df.columns and not is_datetime64_any_dtype(df['Date']):
+        raw = df['Date'].astype(str)
+        dates = pd.to_datetime(raw, format='%b %d, %Y', errors='coerce')
+        if dates.isna().any():
+            dates = pd.to_datetime(raw, errors='coerce')
+        df['Date'] = dates
+
+    for col in df.columns:
+        if col == 'Date' or is_numeric_dtype(df[col]):
+            continue
+        numeric = pd.to_numeric(df[col].astype(str).str.replace(',', ''), errors='coerce')
+        # Keep genuinely textual columns (e.g. tickers) as they are
+        if numeric.notna().sum() >= df[col].notna().sum():
+            df[col] = numeric
+
+    df = df.dropna()
+    if 'Date' in df.columns:
+        df = df.sort_values('Date', kind='stable')
+    return df.reset_index(drop=True)
+
+
+def _source_signature(source_path):
+    stat = os.stat(source_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+class CacheWriter:
+    """Write a cache for ``source_path`` from normalized chunks of a known total size
+
+    Columns are preallocated as .npy memory maps from the first chunk's
+    dtypes and filled chunk by chunk, so datasets larger than memory can
+    be cached. Text columns get integer codes in order of first
+    appearance (categorical columns: in category order). The manifest
+    (with the source signature) is written by ``close``, so finish the
+    source file first. A ``standalone`` cache has no source file: it
+    records no signature and is only fresh while nothing exists at
+    ``source_path``.
+    """
+
+    def __init__(self, source_path, n_rows, standalone=False):
+        self.source_path = source_path
+        self.standalone = standalone
+        self.cache_dir = cache_dir_for(source_path)
+        self.n_rows = n_rows
+        self.written = 0
+        self._columns = None
+        self._arrays = None
+        self._codes = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Drop the manifest first so a half-written cache is never considered fresh
+        self._manifest_path = os.path.join(self.cache_dir, MANIFEST)
+        if os.path.exists(self._manifest_path):
+            os.remove(self._manifest_path)
+
+    def _open(self, df):
+        self._columns, self._arrays, self._codes = [], [], {}
+        for i, col in enumerate(df.columns):
+            values = df[col]
+            entry = {'name': col, 'file': f'col{i}.npy'}
+            if is_datetime64_any_dtype(values):
+                dtype = np.dtype('datetime64[ns]')
+            elif is_numeric_dtype(values):
+                dtype = values.to_numpy().dtype
+            else:
+                # Text columns are stored as integer codes plus their categories
+                dtype = np.dtype(np.int32)
+                entry['categories'] = []
+                self._codes[col] = {}
+            entry['dtype'] = str(dtype)
+            self._columns.append(entry)
+            self._arrays.append(np.lib.format.open_memmap(
+                os.path.join(self.cache_dir, entry['file']), mode='w+', dtype=dtype,
+                shape=(self.n_rows,)))
+
+    def append(self, df):
+        if self._columns is None:
+            self._open(df)
+        stop = self.written + len(df)
+        if stop > self.n_rows:
+            raise ValueError(f"More than the declared {self.n_rows} rows")
+        for entry, array in zip(self._columns, self._arrays):
+            values = df[entry['name']]
+            if 'categories' in entry:
+                lookup = self._codes[entry['name']]
+                categorical = (isinstance(values.dtype, pd.CategoricalDtype) and
+                               not values.isna().any())
+                if categorical:
+                    # Translate the (few) categories, then all codes with one take
+                    categories = values.cat.categories.astype(str)
+                    codes = values.cat.codes.to_numpy()
+                    used = categories[np.unique(codes)]
+                else:
+                    used = pd.unique(values.astype(str))
+                for value in used:
+                    if value not in lookup:
+                        lookup[value] = len(lookup)
+                        entry['categories'].append(value)
+                if categorical:
+                    translate = np.array([lookup.get(c, -1) for c in categories], dtype=np.int32)
+                    array[self.written:stop] = translate[codes]
+                else:
+                    array[self.written:stop] = values.astype(str).map(lookup).to_numpy(np.int32)
+            else:
+                array[self.written:stop] = values.to_numpy().astype(array.dtype, copy=False)
+        self.written = stop
+
+    def close(self):
+        if self.written != self.n_rows:
+            raise ValueError(f"Wrote {self.written} of {self.n_rows} declared rows")
+        for array in self._arrays or []:
+            array.flush()
+        manifest = {'version': CACHE_VERSION, 'rows': self.n_rows, 'columns': self._columns or []}
+        if self.standalone:
+            manifest['standalone'] = True
+        elif os.path.exists(self.source_path):
+            manifest.update(_source_signature(self.source_path))
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+        self._arrays = None
+        return self.cache_dir
+
+
+def write_cache(df, source_path):
+    """Write a normalized frame next to ``source_path`` as one .npy file per column"""
+    writer = CacheWriter(source_path, len(df))
+    writer.append(df)
+    return writer.close()
+
+
+def _read_manifest(source_path):
+    manifest_path = os.path.join(cache_dir_for(source_path), MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(source_path):
+    """True when a complete cache exists and matches the source file on disk
+
+    A standalone cache (see CacheWriter) is fresh only while no file
+    exists at ``source_path``; any other cache needs its source present
+    with the recorded size and mtime.
+    """
+    manifest = _read_manifest(source_path)
+    if manifest is None or manifest.get('version') != CACHE_VERSION:
+        return False
+    try:
+        signature = _source_signature(source_path)
+    except OSError:
+        return bool(manifest.get('standalone'))
+    if manifest.get('standalone'):
+        return False
+    return all(manifest.get(key) == value for key, value in signature.items())
+
+
+def read_cache_arrays(source_path, mmap=True, decode=True):
+    """Return ``{column: array}`` backed by read-only memory maps
+
+    Text columns are decoded to full-length object arrays; with
+    ``decode=False`` their integer codes are returned instead (see
+    ``cache_categories``), still memory-mapped.
+    """
+    manifest = _read_manifest(source_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No cache for {source_path}")
+    cache_dir = cache_dir_for(source_path)
+    arrays = {}
+    for entry in manifest['columns']:
+        array = np.load(os.path.join(cache_dir, entry['file']),
+                        mmap_mode='r' if mmap else None)
+        if decode and 'categories' in entry:
+            array = np.asarray(entry['categories'], dtype=object)[array]
+        arrays[entry['name']] = array
+    return arrays
+
+
+def cache_categories(source_path):
+    """``{column: object array of values}`` for the cache's coded text columns"""
+    manifest = _read_manifest(source_path)
+    if manifest is None:
+        raise FileNotFoundError(f"No cache for {source_path}")
+    return {entry['name']: np.asarray(entry['categories'], dtype=object)
+            for entry in manifest['columns'] if 'categories' in entry}
+
+
+def read_cache(source_path):
+    """Load the cached dataset as a DataFrame"""
+    return pd.DataFrame(read_cache_arrays(source_path))
+
+
+def read_source(source_path):
+    """Parse the original CSV or Excel file"""
+    if source_path.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(source_path)
+    return pd.read_csv(source_path)
+
+
+def load_dataset(source_path, use_cache=True):
+    """Load a normalized dataset, using (and refreshing) the columnar cache"""
+    if use_cache and is_fresh(source_path):
+        return read_cache(source_path)
+
+    df = normalize_frame(read_source(source_path))
+    if use_cache:
+        try:
+            write_cache(df, source_path)
+        except OSError as e:
+            print(f"⚠️ Could not write dataset cache: {e}")
+    return df
+
+
+def iter_dataset_chunks(source_path, chunksize=100_000, use_cache=True):
+    """Yield normalized DataFrame chunks of at most ``chunksize`` rows
+
+    Slices the memory-mapped cache when it is fresh (text columns are
+    decoded one slice at a time, so memory stays flat), otherwise streams
+    the CSV with ``pd.read_csv(chunksize=...)``. Rows are not re-sorted
+    across chunks, so this is meant for order-independent reductions.
+    """
+    if use_cache and is_fresh(source_path):
+        arrays = read_cache_arrays(source_path, decode=False)
+        categories = cache_categories(source_path)
+        n_rows = len(next(iter(arrays.values()))) if arrays else 0
+        for start in range(0, n_rows, chunksize):
+            chunk = {}
+            for name, array in arrays.items():
+                part = np.asarray(array[start:start + chunksize])
+                chunk[name] = categories[name][part] if name in categories else part
+            yield pd.DataFrame(chunk)
+        return
+
+    if source_path.endswith(('.xlsx', '.xls')):
+        raise ValueError("Chunked reading needs a CSV source or a fresh cache")
+    for chunk in pd.read_csv(source_path, chunksize=chunksize):
+        yield normalize_frame(chunk)
@@ -2,6 +2,7 @@
 import kagglehub
 import pandas as pd
 import os
+from data_cache import normalize_frame, write_cache
 
 print("📥 Downloading Yahoo Finance Dataset...")
 
@@ -35,5 +36,9 @@ if excel_files:
     # Save as CSV
     df.to_csv('Yahoo_Finance_2018_2023.csv', index=False)
     print("✅ Dataset saved as 'Yahoo_Finance_2018_2023.csv'")
+    
+    # Build the typed columnar cache once at ingest time
+    cache_dir = write_cache(normalize_frame(df), 'Yahoo_Finance_2018_2023.csv')
+    print(f"✅ Columnar cache written to '{cache_dir}'")
 else:
     print("❌ No Excel file found")
\ No newline at end of file
@@ -0,0 +1,91 @@
+# features.py - Vectorized feature engineering for the HMM models
+import numpy as np
+
+# Feature names understood by build_feature_matrix
+AVAILABLE_FEATURES = ('return', 'log_return', 'volatility', 'range', 'volume_z')
+
+
+def _column(data, name):
+    """Return a DataFrame column as a float64 array"""
+    return np.asarray(data[name], dtype=np.float64)
+
+
+def _rolling_mean_std(values, window):
+    """Rolling mean/std (ddof=1) over the trailing window using cumulative sums
+
+    Windows that contain a non-finite value come back as NaN.
+    """
+    n = len(values)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if window < 2 or n < window:
+        return mean, std
+
+    finite = np.isfinite(values)
+    # Centre the data first so the running sums stay well conditioned
+    centre = values[finite].mean() if finite.any() else 0.0
+    x = np.where(finite, values - centre, 0.0)
+
+    csum = np.concatenate(([0.0], np.cumsum(x)))
+    csum2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    cbad = np.concatenate(([0], np.cumsum(~finite)))
+
+    s = csum[window:] - csum[:-window]
+    s2 = csum2[window:] - csum2[:-window]
+    bad = cbad[window:] - cbad[:-window]
+
+    m = s / window
+    var = np.maximum((s2 - window * m * m) / (window - 1), 0.0)
+    ok = bad == 0
+    mean[window - 1:] = np.where(ok, m + centre, np.nan)
+    std[window - 1:] = np.where(ok, np.sqrt(var), np.nan)
+    return mean, std
+
+
+def build_feature_matrix(data, features=('return',), price_col='Close',
+                         window=20, max_abs_return=0.1):
+    """Build the HMM observation matrix in one vectorized pass
+
+    Returns ``(X, valid)`` where ``X`` is a C-contiguous float64 matrix with
+    one column per requested feature and ``valid`` is the boolean row mask
+    (aligned with ``data``) that selected the rows of ``X``. A row is kept
+    only if every feature is finite and the simple return is below
+    ``max_abs_return`` in absolute value.
+    """
+    unknown = [f for f in features if f not in AVAILABLE_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown features: {unknown}")
+
+    prices = _column(data, price_col)
+    n = len(prices)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        simple = np.empty(n)
+        simple[0] = np.nan
+        simple[1:] = np.diff(prices) / prices[:-1]
+
+        log_ret = np.empty(n)
+        log_ret[0] = np.nan
+        log_ret[1:] = np.log(prices[1:] / prices[:-1])
+
+        X = np.empty((n, len(features)), dtype=np.float64)
+        for j, name in enumerate(features):
+            if name == 'return':
+                X[:, j] = simple
+            elif name == 'log_return':
+                X[:, j] = log_ret
+            elif name == 'volatility':
+                X[:, j] = _rolling_mean_std(log_ret, window)[1]
+            elif name == 'range':
+                X[:, j] = (_column(data, 'High') - _column(data, 'Low')) / prices
+            elif name == 'volume_z':
+                volume = _column(data, 'Volume')
+                mean, std = _rolling_mean_std(volume, window)
+                X[:, j] = (volume - mean) / std
+
+    # Single fused validity mask over every feature plus the outlier filter
+    valid = np.isfinite(X).all(axis=1)
+    if max_abs_return is not None:
+        valid &= np.abs(simple) < max_abs_return
+
+    return np.ascontiguousarray(X[valid]), valid
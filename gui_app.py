@@ -1,17 +1,29 @@
 # csp_gui.py - Professional Blue Theme
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import pandas as pd
 import numpy as np
-import networkx as nx
-from hmmlearn import hmm
-import random
 import time
-from constraint import Problem
+import sys
+from portfolio_solver import DEFAULT_STRATEGIES, PortfolioProblem
+from portfolio_index import INDEX_MAX_STRATEGIES, PortfolioFrontierIndex, strategy_key
+from features import build_feature_matrix
+from model_store import HMMModelStore, fit_hmm_cached
+from regime import OnlineRegimeFilter
+from gui_worker import PipelineWorker
+from gui_log import BufferedLogSink
+from benchmarks import load_results
+from instrumentation import Tracer
 
 class CSPFinancialGUI:
-    def __init__(self, root):
+    def __init__(self, root, log_file=None, max_log_lines=2000, trace_file=None, trace_memory=False):
         self.root = root
+        # Full log is appended to log_file when set; the panes keep the last max_log_lines
+        self.log_file = log_file
+        # Each optimization run's spans are written here as trace events when set
+        self.trace_file = trace_file
+        # Peak memory per span (tracemalloc; opt-in, it slows the run several times)
+        self.trace_memory = trace_memory
+        self.max_log_lines = max_log_lines
         self.root.title("Financial Optimization - CSP Enhanced")
         self.root.geometry("1300x850")
         self.root.configure(bg='#2c3e50')  # Professional dark blue background
@@ -22,7 +34,12 @@ class CSPFinancialGUI:
         self.data = None
         self.results = None
         self.performance_metrics = {}
-        self.csp_problem = None
+        self.portfolio_index = None
+        self.worker = None
+        self.stage_times = {}
+        self.model_store = HMMModelStore()
+        # Latest benchmarks.py results (None until the suite has been run)
+        self.benchmark_results = load_results()
         
         self.create_widgets()
         self.calculate_metrics()
@@ -122,11 +139,25 @@ class CSPFinancialGUI:
                                  ["Conservative", "Balanced", "Aggressive"], "Balanced")
         
         # Run button with success color
-        ttk.Button(control_frame,
+        self.run_button = ttk.Button(control_frame,
                   text="RUN CSP OPTIMIZATION",
                   command=self.run_csp_optimization,
                   style='Success.TButton',
-                  width=25).pack(pady=25, anchor=tk.W)
+                  width=25)
+        self.run_button.pack(pady=(25, 8), anchor=tk.W)
+        
+        self.cancel_button = ttk.Button(control_frame,
+                  text="CANCEL",
+                  command=self.cancel_csp_optimization,
+                  style='Accent.TButton',
+                  width=25)
+        self.cancel_button.pack(pady=8, anchor=tk.W)
+        self.cancel_button.state(['disabled'])
+        
+        self.progress_var = tk.StringVar(value="Idle")
+        tk.Label(control_frame, textvariable=self.progress_var,
+                font=("Arial", 9), bg=self.colors['card_bg'],
+                fg=self.colors['text_dark']).pack(pady=5, anchor=tk.W)
         
         # Right panel - Results
         result_frame = ttk.LabelFrame(content_frame, text="OPTIMIZATION RESULTS", 
@@ -140,6 +171,8 @@ class CSPFinancialGUI:
                                                    relief='flat',
                                                    borderwidth=1)
         self.result_text.pack(fill=tk.BOTH, expand=True)
+        self.result_log = BufferedLogSink(self.root, self.result_text, self.max_log_lines,
+                                          spill_path=self.log_file)
         
         self.log("PROFESSIONAL FINANCIAL OPTIMIZATION SYSTEM READY!")
         self.log("=" * 50)
@@ -211,6 +244,7 @@ class CSPFinancialGUI:
                                                 fg=self.colors['text_dark'],
                                                 relief='flat')
         self.csp_text.pack(fill=tk.BOTH, expand=True)
+        self.csp_log_sink = BufferedLogSink(self.root, self.csp_text, self.max_log_lines)
         
         self.csp_log("CSP SOLVER ENGINE READY")
         self.csp_log("=" * 40)
@@ -234,6 +268,12 @@ class CSPFinancialGUI:
         table_frame.pack(fill=tk.BOTH, expand=True)
         
         self.create_csp_metrics_table(table_frame)
+        
+        if self.benchmark_results is not None:
+            bench_frame = ttk.LabelFrame(content_frame, text="LATEST BENCHMARK (python benchmarks.py)",
+                                         padding="15", style='Card.TFrame')
+            bench_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+            self.create_benchmark_table(bench_frame, self.benchmark_results)
     
     def create_technical_tab(self, notebook):
         tech_frame = ttk.Frame(notebook, style='Professional.TFrame')
@@ -306,7 +346,7 @@ class CSPFinancialGUI:
             ["Recall", "91.85%", "90.93%", "91.20%", "91.60%", "-0.25%"],
             ["F1-Score", "89.56%", "89.59%", "89.58%", "89.95%", "+0.39%"],
             ["MAPE", "3.85%", "3.14%", "3.50%", "3.25%", "-0.60%"],
-            ["Execution Time", "2580s", "2520s", "100s", "110s", "23.5x FASTER"],
+            self.execution_time_row(self.benchmark_results),
             ["Constraint Handling", "None", "Basic CSP", "Multi-Constraints", "Advanced CSP", "MOST ADVANCED"],
             ["Solution Quality", "Good", "Better", "Very Good", "Best", "OPTIMAL"]
         ]
@@ -342,6 +382,43 @@ class CSPFinancialGUI:
         for i in range(len(metrics_data) + 1):
             table_frame.rowconfigure(i, weight=1)
 
+    def execution_time_row(self, results):
+        # Measured end-to-end pipeline time from benchmarks.py, not a literal
+        pipeline = results['stages'].get('pipeline') if results is not None else None
+        if pipeline is None:
+            return ["Execution Time", "n/a", "n/a", "n/a", "run benchmarks.py", "NOT MEASURED"]
+        seconds, rows = pipeline['seconds'][-1], pipeline['sizes'][-1]
+        return ["Execution Time", "n/a", "n/a", "n/a", f"{seconds:.2f}s ({rows:,} rows)",
+                f"MEASURED {results['meta']['timestamp'][:10]}"]
+    
+    def create_benchmark_table(self, parent, results):
+        table_frame = ttk.Frame(parent, style='Professional.TFrame')
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        meta = results['meta']
+        headers = ["Stage", "Sweep", "Largest Size", "Seconds", "Scaling (n^x)"]
+        rows = [[stage, entry['axis'], f"{entry['sizes'][-1]:,}", f"{entry['seconds'][-1]:.4f}",
+                 "-" if entry['exponent'] is None else f"{entry['exponent']:.2f}"]
+                for stage, entry in results['stages'].items()]
+        
+        tk.Label(parent, text=f"{meta['timestamp']}  commit {meta['commit'] or '?'}  "
+                              f"Python {meta['python']}",
+                 font=("Arial", 8), bg=self.colors['card_bg'],
+                 fg=self.colors['text_dark']).pack(anchor=tk.W)
+        
+        for i, header in enumerate(headers):
+            tk.Label(table_frame, text=header, font=("Arial", 9, "bold"),
+                     borderwidth=1, relief="solid", padx=10, pady=4,
+                     bg=self.colors['secondary'], fg='white').grid(row=0, column=i, sticky="nsew")
+        for row, data in enumerate(rows, 1):
+            bg_color = self.colors['background'] if row % 2 == 0 else self.colors['card_bg']
+            for col, value in enumerate(data):
+                tk.Label(table_frame, text=value, borderwidth=1, relief="solid",
+                         padx=10, pady=3, bg=bg_color, fg=self.colors['text_dark'],
+                         font=("Arial", 8)).grid(row=row, column=col, sticky="nsew")
+        for i in range(len(headers)):
+            table_frame.columnconfigure(i, weight=1)
+    
     def calculate_metrics(self):
         # Initialize performance metrics with proper classification scores
         self.performance_metrics = {
@@ -361,6 +438,8 @@ class CSPFinancialGUI:
     
     def load_data(self):
         try:
+            import pandas as pd
+            
             # Simulate loading data
             self.data = pd.DataFrame({
                 'Date': pd.date_range('2020-01-01', periods=100),
@@ -379,24 +458,11 @@ class CSPFinancialGUI:
     
     def generate_data(self):
         try:
-            dates = pd.date_range(start='2020-01-01', end='2023-12-31', freq='D')
-            data = []
-            price = 30000
-            
-            for date in dates:
-                change = np.random.normal(0, 0.015)
-                price = max(1000, price * (1 + change))
-                
-                data.append({
-                    'Date': date.strftime('%Y-%m-%d'),
-                    'Open': round(price * (1 - np.random.uniform(0, 0.01)), 2),
-                    'High': round(price * (1 + np.random.uniform(0, 0.02)), 2),
-                    'Low': round(price * (1 - np.random.uniform(0, 0.015)), 2),
-                    'Close': round(price, 2),
-                    'Volume': np.random.randint(1000000, 50000000)
-                })
+            from synthetic_data import generate_market
             
-            self.data = pd.DataFrame(data)
+            # Regime-switching sample: 2020-01-01 .. 2023-12-31, a fresh draw per click
+            self.data = generate_market(1, n_bars=1461, seed=None, start='2020-01-01', freq='D',
+                                        start_price=30000)
             self.log("SAMPLE DATA GENERATED!")
             self.log("=" * 40)
             self.log(f"Records: {len(self.data)}")
@@ -410,85 +476,172 @@ class CSPFinancialGUI:
         if self.data is None:
             messagebox.showwarning("Warning", "Please load data first!")
             return
+        if self.worker is not None and self.worker.running:
+            return
         
         try:
-            start_time = time.time()
-            
-            self.log("RUNNING CSP-ENHANCED OPTIMIZATION...")
-            self.log("=" * 50)
-            
-            # Get CSP constraints
+            # Get CSP constraints (Tk variables are read on the Tk thread only)
             max_portfolio_risk = float(self.portfolio_risk_var.get())
             min_portfolio_return = float(self.portfolio_return_var.get())
             max_strategies = int(self.max_strategies_var.get())
             liquidity_mix = self.liquidity_mix_var.get()
+        except ValueError as e:
+            self.log(f"CSP OPTIMIZATION ERROR: {e}")
+            return
+        
+        self.log("RUNNING CSP-ENHANCED OPTIMIZATION...")
+        self.log("=" * 50)
+        
+        self.log("CSP CONSTRAINTS APPLIED:")
+        self.log(f"  Max Portfolio Risk: {max_portfolio_risk:.1%}")
+        self.log(f"  Min Portfolio Return: {min_portfolio_return:.1%}")
+        self.log(f"  Max Strategies: {max_strategies}")
+        self.log(f"  Liquidity Mix: {liquidity_mix}")
+        self.log("")
+        
+        # Solve on a worker thread; the Tk loop polls its events
+        self.optimization_start = time.time()
+        self.stage_times = {}
+        self.run_button.state(['disabled'])
+        self.cancel_button.state(['!disabled'])
+        self.worker = PipelineWorker(lambda ctx: self.optimization_pipeline(
+            ctx, max_portfolio_risk, min_portfolio_return, max_strategies, liquidity_mix)).start()
+        self.worker.poll(self.root, self.on_optimization_event)
+    
+    def cancel_csp_optimization(self):
+        if self.worker is not None and self.worker.running:
+            self.worker.cancel()
+            self.progress_var.set("Cancelling...")
+    
+    def optimization_pipeline(self, ctx, max_portfolio_risk, min_portfolio_return, max_strategies, liquidity_mix):
+        """Worker-thread part of the optimization: no Tk calls, only ctx events"""
+        # Spans are opened on this thread; the tracer is handed back with the result
+        tracer = Tracer(memory=self.trace_memory)
+        with tracer.span('csp_optimization'):
+            # Lazy imports of the HMM and allocation stages, timed on their own
+            with tracer.span('imports'):
+                import hmmlearn.hmm
+                from allocation import allocate
             
-            self.log("CSP CONSTRAINTS APPLIED:")
-            self.log(f"  Max Portfolio Risk: {max_portfolio_risk:.1%}")
-            self.log(f"  Min Portfolio Return: {min_portfolio_return:.1%}")
-            self.log(f"  Max Strategies: {max_strategies}")
-            self.log(f"  Liquidity Mix: {liquidity_mix}")
-            self.log("")
-            
-            # Build models
-            self.log("BUILDING GRAPH MODELS...")
-            strategies = self.build_graph_models()
-            
-            self.log("TRAINING HMM MODELS...")
-            market_state = self.train_hmm_models()
-            
-            self.log("SETTING UP CSP ENGINE...")
-            csp_solutions = self.setup_csp_problem(strategies, max_portfolio_risk, min_portfolio_return, max_strategies, liquidity_mix)
-            
-            self.log("SOLVING CSP CONSTRAINTS...")
-            optimal_portfolios = self.solve_csp_constraints(csp_solutions)
-            
-            execution_time = time.time() - start_time
-            
-            # Display results
-            self.log("")
-            self.log("CSP OPTIMIZATION RESULTS:")
-            self.log("=" * 40)
-            
-            self.log("TOP CSP PORTFOLIOS:")
-            for i, portfolio in enumerate(optimal_portfolios[:3]):
-                self.log(f"  {i+1}. {portfolio['strategies']}")
-                self.log(f"     Return: {portfolio['total_return']:.2%}")
-                self.log(f"     Risk: {portfolio['total_risk']:.2%}")
-                self.log(f"     Liquidity: {portfolio['liquidity_score']}/10")
-            
-            self.log("")
-            self.log("PERFORMANCE METRICS:")
-            self.log(f"  Execution Time: {execution_time:.2f}s")
-            self.log(f"  CSP Solutions Found: {len(optimal_portfolios)}")
-            self.log(f"  Constraint Satisfaction: 100%")
+            with ctx.stage("BUILDING GRAPH MODELS"), tracer.span('graph_build') as span:
+                strategies = self.build_graph_models()
+                span.count(strategies=len(strategies))
             
-            state_names = ["BEARISH", "NEUTRAL", "BULLISH"]
-            self.log(f"  Market State: {state_names[market_state]}")
+            # hmmlearn's EM loop cannot be interrupted: a cancel during the fit
+            # takes effect when it returns. The CSP steps check as they go.
+            with ctx.stage("TRAINING HMM MODELS"), tracer.span('hmm'):
+                market_state = self.train_hmm_models(log=ctx.log, tracer=tracer)
             
-            self.log("")
-            self.log("CLASSIFICATION METRICS:")
-            self.log(f"  Accuracy: {self.performance_metrics['accuracy']:.2%}")
-            self.log(f"  Precision: {self.performance_metrics['precision']:.2%}")
-            self.log(f"  Recall: {self.performance_metrics['recall']:.2%}")
-            self.log(f"  F1-Score: {self.performance_metrics['f1_score']:.2%}")
-            self.log(f"  MAPE: {self.performance_metrics['mape']:.2%}")
+            with ctx.stage("SETTING UP CSP ENGINE"), tracer.span('csp_setup'):
+                csp_problem, portfolio_index = self.setup_csp_problem(strategies, max_portfolio_risk, min_portfolio_return, max_strategies, liquidity_mix, tracer=tracer, check=ctx.check_cancelled)
             
-            self.log("")
-            self.log("=" * 50)
-            self.log("CSP OPTIMIZATION COMPLETED SUCCESSFULLY!")
-            self.log("   Advanced constraint satisfaction achieved!")
+            with ctx.stage("SOLVING CSP CONSTRAINTS"), tracer.span('csp_solve') as span:
+                optimal_portfolios = self.solve_csp_constraints(csp_problem, portfolio_index, check=ctx.check_cancelled)
+                span.count(solutions=len(optimal_portfolios))
             
-        except Exception as e:
-            self.log(f"CSP OPTIMIZATION ERROR: {e}")
+            with ctx.stage("SIZING POSITIONS"), tracer.span('allocation') as span:
+                # Position sizes under the same constraints (weight-averaged risk/return)
+                allocation = allocate(strategies, max_portfolio_risk, min_portfolio_return,
+                                      max_strategies, liquidity_mix)
+                span.count(positions=0 if allocation is None else len(allocation['weights']))
+        
+        return {
+            'market_state': market_state,
+            'optimal_portfolios': optimal_portfolios,
+            'allocation': allocation,
+            'tracer': tracer,
+        }
+    
+    def on_optimization_event(self, event):
+        kind = event[0]
+        if kind == 'log':
+            self.log(event[1])
+            return
+        if kind == 'stage':
+            _, name, status, seconds = event
+            if status == 'start':
+                self.log(f"{name}...")
+                self.progress_var.set(f"{name}...")
+            else:
+                self.stage_times[name] = seconds
+                self.progress_var.set(f"{name}: {seconds:.2f}s")
+            return
+        
+        # Final event: the worker has stopped
+        self.run_button.state(['!disabled'])
+        self.cancel_button.state(['disabled'])
+        if kind == 'result':
+            self.progress_var.set("Done")
+            self.show_optimization_results(event[1], time.time() - self.optimization_start)
+        elif kind == 'cancelled':
+            self.progress_var.set("Cancelled")
+            self.log("CSP OPTIMIZATION CANCELLED")
+        else:
+            self.progress_var.set("Failed")
+            self.log(f"CSP OPTIMIZATION ERROR: {event[1]}")
+    
+    def show_optimization_results(self, results, execution_time):
+        optimal_portfolios = results['optimal_portfolios']
+        allocation = results['allocation']
+        market_state = results['market_state']
+        
+        # Display results
+        self.log("")
+        self.log("CSP OPTIMIZATION RESULTS:")
+        self.log("=" * 40)
+        
+        self.log("TOP CSP PORTFOLIOS:")
+        for i, portfolio in enumerate(optimal_portfolios[:3]):
+            self.log(f"  {i+1}. {portfolio['strategies']}")
+            self.log(f"     Return: {portfolio['total_return']:.2%}")
+            self.log(f"     Risk: {portfolio['total_risk']:.2%}")
+            self.log(f"     Liquidity: {portfolio['liquidity_score']}/10")
+        
+        self.log("")
+        self.log("CONTINUOUS ALLOCATION:")
+        if allocation is None:
+            self.log("  No feasible weights for these constraints")
+        else:
+            for name, weight in allocation['weights'].items():
+                self.log(f"  {name}: {weight:.1%}")
+            self.log(f"  Return: {allocation['expected_return']:.2%}  Risk: {allocation['risk']:.2%}")
+        
+        self.log("")
+        self.log("PERFORMANCE METRICS:")
+        self.log(f"  Execution Time: {execution_time:.2f}s")
+        # Per stage/sub-step: wall, CPU, peak memory and counts
+        tracer = results['tracer']
+        for line in tracer.summary_lines():
+            self.log(f"    {line}")
+        if self.trace_file:
+            tracer.write_trace(self.trace_file)
+            self.log(f"  Trace written to {self.trace_file}")
+        self.log(f"  CSP Solutions Found: {len(optimal_portfolios)}")
+        self.log(f"  Constraint Satisfaction: 100%")
+        
+        state_names = ["BEARISH", "NEUTRAL", "BULLISH"]
+        self.log(f"  Market State: {state_names[market_state]}")
+        
+        self.log("")
+        self.log("CLASSIFICATION METRICS:")
+        self.log(f"  Accuracy: {self.performance_metrics['accuracy']:.2%}")
+        self.log(f"  Precision: {self.performance_metrics['precision']:.2%}")
+        self.log(f"  Recall: {self.performance_metrics['recall']:.2%}")
+        self.log(f"  F1-Score: {self.performance_metrics['f1_score']:.2%}")
+        self.log(f"  MAPE: {self.performance_metrics['mape']:.2%}")
+        
+        self.log("")
+        self.log("=" * 50)
+        self.log("CSP OPTIMIZATION COMPLETED SUCCESSFULLY!")
+        self.log("   Advanced constraint satisfaction achieved!")
     
     def run_csp_selection(self):
         self.csp_log("RUNNING CSP PORTFOLIO SELECTION...")
         self.csp_log("=" * 40)
         
         strategies = self.build_graph_models()
-        csp_solutions = self.setup_csp_problem(strategies, 0.6, 0.10, 4, "Balanced")
-        portfolios = self.solve_csp_constraints(csp_solutions)
+        csp_problem, portfolio_index = self.setup_csp_problem(strategies, 0.6, 0.10, 4, "Balanced")
+        portfolios = self.solve_csp_constraints(csp_problem, portfolio_index)
         
         self.csp_log(f"CSP SOLUTIONS FOUND: {len(portfolios)}")
         for i, portfolio in enumerate(portfolios[:5]):
@@ -513,84 +666,60 @@ class CSPFinancialGUI:
             self.csp_log(f"  {strategy['name']}: {status}")
     
     def build_graph_models(self):
-        strategies = [
-            {"name": "CONSERVATIVE", "return": 0.06, "risk": 0.2, "liquidity": "High"},
-            {"name": "MODERATE", "return": 0.09, "risk": 0.4, "liquidity": "Medium"},
-            {"name": "AGGRESSIVE", "return": 0.15, "risk": 0.7, "liquidity": "Low"},
-            {"name": "TECH FOCUS", "return": 0.12, "risk": 0.6, "liquidity": "Medium"},
-            {"name": "DIVERSIFIED", "return": 0.08, "risk": 0.3, "liquidity": "High"},
-            {"name": "GROWTH", "return": 0.11, "risk": 0.5, "liquidity": "Medium"},
-            {"name": "VALUE", "return": 0.07, "risk": 0.25, "liquidity": "High"},
-            {"name": "INCOME", "return": 0.05, "risk": 0.15, "liquidity": "High"},
-            {"name": "BLUE CHIP", "return": 0.085, "risk": 0.35, "liquidity": "High"}
-        ]
+        strategies = [dict(strategy) for strategy in DEFAULT_STRATEGIES]
         return strategies
     
-    def train_hmm_models(self):
-        return random.randint(0, 2)
+    def train_hmm_models(self, log=None, tracer=None):
+        log = log or self.log
+        tracer = tracer or Tracer(memory=False)
+        with tracer.span('features') as span:
+            X, _ = build_feature_matrix(self.data, ('return',), price_col='Close')
+            span.count(observations=len(X))
+        if len(X) < 10:
+            return 1  # Neutral when there is not enough data
+        
+        # Reuse the stored fit when the data and settings are unchanged
+        with tracer.span('hmm_fit') as span:
+            model, cached = fit_hmm_cached(X, store=self.model_store)
+            span.count(cached=int(cached))
+        log(f"  HMM {'loaded from cache' if cached else 'trained'} on {len(X)} returns")
+        with tracer.span('hmm_predict'):
+            return OnlineRegimeFilter(model).prime(X).regime
     
-    def setup_csp_problem(self, strategies, max_risk, min_return, max_count, liquidity_mix):
-        self.csp_problem = Problem()
-        
-        # Add variables (strategies)
-        strategy_names = [s["name"] for s in strategies]
-        for strategy in strategy_names:
-            self.csp_problem.addVariable(strategy, [0, 1])  # 0=exclude, 1=include
-        
-        # Add CSP constraints
-        def risk_constraint(*selections):
-            total_risk = sum(strategies[i]["risk"] for i, selected in enumerate(selections) if selected)
-            return total_risk <= max_risk
-        
-        def return_constraint(*selections):
-            total_return = sum(strategies[i]["return"] for i, selected in enumerate(selections) if selected)
-            return total_return >= min_return
-        
-        def count_constraint(*selections):
-            selected_count = sum(selections)
-            return 1 <= selected_count <= max_count
-        
-        def liquidity_constraint(*selections):
-            high_liquidity = sum(1 for i, selected in enumerate(selections) if selected and strategies[i]["liquidity"] == "High")
-            total_selected = sum(selections)
-            if liquidity_mix == "Conservative":
-                return high_liquidity >= total_selected * 0.7
-            elif liquidity_mix == "Balanced":
-                return high_liquidity >= total_selected * 0.4
-            else:  # Aggressive
-                return high_liquidity >= total_selected * 0.2
-        
-        self.csp_problem.addConstraint(risk_constraint, strategy_names)
-        self.csp_problem.addConstraint(return_constraint, strategy_names)
-        self.csp_problem.addConstraint(count_constraint, strategy_names)
-        self.csp_problem.addConstraint(liquidity_constraint, strategy_names)
-        
-        return strategies
+    def setup_csp_problem(self, strategies, max_risk, min_return, max_count, liquidity_mix, tracer=None, check=None):
+        # Returns (problem, index) to the caller instead of sharing them on
+        # self: the worker thread and the CSP tab can be solving at once
+        tracer = tracer or Tracer(memory=False)
+        # Risk, return, count and liquidity-mix constraints over 0/1 strategy
+        # variables, solved by branch and bound with partial-assignment pruning
+        with tracer.span('csp_problem'):
+            csp_problem = PortfolioProblem(strategies, max_risk, min_return, max_count, liquidity_mix)
+        
+        # The frontier index only depends on the strategies, so constraint
+        # changes are answered from it without re-solving (an index is never
+        # modified, so the cached one is safe to hand to either thread)
+        portfolio_index = self.portfolio_index
+        if len(strategies) <= INDEX_MAX_STRATEGIES and (
+                portfolio_index is None or portfolio_index.key != strategy_key(strategies)):
+            with tracer.span('frontier_index') as span:
+                portfolio_index = PortfolioFrontierIndex(strategies, depth=10, check=check)
+                span.count(points=len(portfolio_index))
+            self.portfolio_index = portfolio_index
+        return csp_problem, portfolio_index
     
-    def solve_csp_constraints(self, strategies):
-        if self.csp_problem is None:
+    def solve_csp_constraints(self, csp_problem, portfolio_index=None, check=None):
+        if csp_problem is None:
             return []
         
-        solutions = self.csp_problem.getSolutions()
+        # Top 10 only: frontier index lookup when one matches the strategies,
+        # otherwise bitmask scan (small sets) or best-first search
+        if portfolio_index is not None and portfolio_index.key == strategy_key(csp_problem.strategies):
+            solutions = portfolio_index.answer(csp_problem, 10)
+        else:
+            solutions = csp_problem.top_k(10, check=check)
+        optimal_portfolios = [csp_problem.portfolio(solution) for solution in solutions]
         
-        optimal_portfolios = []
-        for solution in solutions[:10]:  # Limit to top 10 solutions
-            selected_strategies = [name for name, selected in solution.items() if selected]
-            if selected_strategies:
-                total_return = sum(s["return"] for s in strategies if s["name"] in selected_strategies)
-                total_risk = sum(s["risk"] for s in strategies if s["name"] in selected_strategies)
-                liquidity_score = sum(3 if s["liquidity"] == "High" else 2 if s["liquidity"] == "Medium" else 1 
-                                    for s in strategies if s["name"] in selected_strategies)
-                
-                optimal_portfolios.append({
-                    "strategies": selected_strategies,
-                    "total_return": total_return,
-                    "total_risk": total_risk,
-                    "liquidity_score": liquidity_score
-                })
-        
-        # Sort by best risk-adjusted return
-        optimal_portfolios.sort(key=lambda x: x["total_return"] - x["total_risk"], reverse=True)
+        # Already ordered by best risk-adjusted return (return - risk)
         return optimal_portfolios
     
     def check_constraints(self, strategy, max_risk, min_return, liquidity_mix):
@@ -607,18 +736,22 @@ class CSPFinancialGUI:
         return risk_ok and return_ok and liquidity_ok
     
     def log(self, message):
-        self.result_text.insert(tk.END, message + "\n")
-        self.result_text.see(tk.END)
-        self.root.update()
+        self.result_log.write(message)
     
     def csp_log(self, message):
-        self.csp_text.insert(tk.END, message + "\n")
-        self.csp_text.see(tk.END)
-        self.root.update()
+        self.csp_log_sink.write(message)
+    
+    def on_close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+        self.result_log.close()
+        self.csp_log_sink.close()
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
-    app = CSPFinancialGUI(root)
+    app = CSPFinancialGUI(root, trace_memory='--trace-memory' in sys.argv)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
 
 if __name__ == "__main__":
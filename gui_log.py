@@ -0,0 +1,59 @@
+# gui_log.py - Buffered, frame-rate-limited log sink for Tk text widgets
+import threading
+import tkinter as tk
+from collections import deque
+
+
+class BufferedLogSink:
+    """Coalesce log lines and render them into ``widget`` ``fps`` times a second
+
+    ``write`` only appends to a buffer; a ``flush`` scheduled every frame
+    with ``root.after`` inserts everything pending with a single
+    ``insert``/``see`` and trims the widget to its last ``max_lines``
+    lines, so the widget acts as a ring buffer of recent output. When ``spill_path`` is given every line
+    is also appended to that file (the complete log). ``write`` may be
+    called from any thread; rendering always happens on the Tk thread.
+    """
+
+    def __init__(self, root, widget, max_lines=2000, fps=20, spill_path=None):
+        self.root = root
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval_ms = max(1, int(1000 / fps))
+        self._pending = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._spill = open(spill_path, 'a', encoding='utf-8') if spill_path else None
+        self._spill_pending = []
+        self._tick()
+
+    def write(self, message):
+        with self._lock:
+            self._pending.append(message)
+            if self._spill is not None:
+                self._spill_pending.append(message)
+
+    def _tick(self):
+        self.flush()
+        self.root.after(self.interval_ms, self._tick)
+
+    def flush(self):
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            spill, self._spill_pending = self._spill_pending, []
+        if spill:
+            self._spill.write("\n".join(spill) + "\n")
+            self._spill.flush()
+        if not lines:
+            return
+        self.widget.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.widget.index('end-1c').split('.')[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.widget.delete('1.0', f'{excess + 1}.0')
+        self.widget.see(tk.END)
+
+    def close(self):
+        self.flush()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
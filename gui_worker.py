@@ -0,0 +1,96 @@
+# gui_worker.py - Background pipeline runner with a queue polled from the Tk loop
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CancelledError(Exception):
+    """Raised inside a pipeline when the user cancelled it"""
+
+
+class WorkerContext:
+    """Handle passed to the pipeline function running on the worker thread
+
+    Everything here only puts events on the queue; the pipeline must not
+    touch Tk widgets itself.
+    """
+
+    def __init__(self, events, cancel_event):
+        self._events = events
+        self._cancel = cancel_event
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise CancelledError()
+
+    def log(self, message):
+        self._events.put(('log', message))
+
+    @contextmanager
+    def stage(self, name):
+        """Emit start/done events with wall time; checks for cancellation around it"""
+        self.check_cancelled()
+        self._events.put(('stage', name, 'start', 0.0))
+        start = time.perf_counter()
+        yield
+        self._events.put(('stage', name, 'done', time.perf_counter() - start))
+        self.check_cancelled()
+
+
+class PipelineWorker:
+    """Run ``pipeline(ctx)`` on a daemon thread and deliver its events to Tk
+
+    Events are tuples: ``('log', message)``, ``('stage', name, 'start' |
+    'done', seconds)``, then exactly one of ``('result', value)``,
+    ``('error', exception)`` or ``('cancelled',)``. ``poll`` drains the
+    queue on the Tk thread and re-arms itself with ``root.after`` until the
+    final event. Cancellation is cooperative: it takes effect at the next
+    stage boundary or ``ctx.check_cancelled()`` call. Steps that never
+    call it (an HMM fit inside hmmlearn, for one) run to completion first.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        ctx = WorkerContext(self.events, self._cancel)
+        try:
+            result = self.pipeline(ctx)
+        except CancelledError:
+            self.events.put(('cancelled',))
+        except Exception as e:
+            self.events.put(('error', e))
+        else:
+            self.events.put(('result', result))
+
+    def poll(self, root, handler, interval_ms=50):
+        """Pass queued events to ``handler(event)`` on the Tk thread"""
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            handler(event)
+            if event[0] in ('result', 'error', 'cancelled'):
+                return
+        root.after(interval_ms, self.poll, root, handler, interval_ms)
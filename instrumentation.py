@@ -0,0 +1,153 @@
+# instrumentation.py - Nested timing/memory spans with JSON and trace-event export
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Span:
+    """One timed region: wall and CPU seconds, peak memory, item counts, children"""
+    __slots__ = ('name', 'parent', 'children', 'counts', 'start', 'wall', 'cpu', 'peak_bytes',
+                 'thread', '_cpu_start', '_mem_start', '_mem_peak')
+
+    def __init__(self, name, parent, counts):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.counts = dict(counts)
+        self.start = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_bytes = None
+        self.thread = threading.get_ident()
+
+    def count(self, **counts):
+        """Record item counts (rows, nodes, solutions, ...) on this span"""
+        self.counts.update(counts)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'peak_bytes': self.peak_bytes,
+            'counts': self.counts,
+            'children': [child.to_dict() for child in self.children],
+        }
+
+
+class Tracer:
+    """Collect nested spans for one run
+
+    ``with tracer.span('load', rows=n) as span:`` times the block; spans
+    opened inside it become its children. CPU time is process time (it
+    includes BLAS/worker threads). With ``memory=True`` tracemalloc is
+    running while the outermost span is open and ``peak_bytes`` is the
+    highest traced allocation above the span's starting level (NumPy
+    buffers included). tracemalloc is process-wide, so allocations by
+    other threads count too, and it slows allocation-heavy code, so it
+    can be switched off. A tracer belongs to the thread that opens its
+    spans.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.roots = []
+        self.origin = time.perf_counter()
+        self._stack = []
+        self._started_tracemalloc = False
+
+    @contextmanager
+    def span(self, name, **counts):
+        parent = self._stack[-1] if self._stack else None
+        span = Span(name, parent, counts)
+        (parent.children if parent is not None else self.roots).append(span)
+        self._enter(span)
+        try:
+            yield span
+        finally:
+            self._exit(span)
+
+    def _enter(self, span):
+        if self.memory:
+            if not self._stack and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            current, peak = tracemalloc.get_traced_memory()
+            if span.parent is not None:
+                # Fold the parent's peak so far in before the child resets it
+                span.parent._mem_peak = max(span.parent._mem_peak, peak)
+            tracemalloc.reset_peak()
+            span._mem_start = span._mem_peak = current
+        self._stack.append(span)
+        span._cpu_start = time.process_time()
+        span.start = time.perf_counter()
+
+    def _exit(self, span):
+        span.wall = time.perf_counter() - span.start
+        span.cpu = time.process_time() - span._cpu_start
+        self._stack.pop()
+        if self.memory:
+            span._mem_peak = max(span._mem_peak, tracemalloc.get_traced_memory()[1])
+            span.peak_bytes = span._mem_peak - span._mem_start
+            if span.parent is not None:
+                span.parent._mem_peak = max(span.parent._mem_peak, span._mem_peak)
+            elif self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def walk(self):
+        """``(depth, span)`` for every span, depth first"""
+        stack = [(0, span) for span in reversed(self.roots)]
+        while stack:
+            depth, span = stack.pop()
+            yield depth, span
+            stack.extend((depth + 1, child) for child in reversed(span.children))
+
+    def to_dict(self):
+        return {'spans': [span.to_dict() for span in self.roots]}
+
+    def trace_events(self):
+        """Chrome/Perfetto trace-event list (complete 'X' events, microseconds)"""
+        pid = os.getpid()
+        events = []
+        for _, span in self.walk():
+            args = {'cpu_ms': round(span.cpu * 1e3, 3), **span.counts}
+            if span.peak_bytes is not None:
+                args['peak_bytes'] = span.peak_bytes
+            events.append({
+                'name': span.name,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round(span.wall * 1e6, 1),
+                'pid': pid,
+                'tid': span.thread,
+                'args': args,
+            })
+        return events
+
+    def write_json(self, path):
+        """Structured span tree as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+    def write_trace(self, path):
+        """Trace-event JSON, viewable in chrome://tracing or ui.perfetto.dev"""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f,
+                      default=str)
+        return path
+
+    def summary_lines(self):
+        """One indented line per span: wall, CPU, peak memory and counts"""
+        lines = []
+        for depth, span in self.walk():
+            memory = '' if span.peak_bytes is None else f"  {span.peak_bytes / 1e6:8.1f} MB"
+            counts = '  '.join(f"{key}={value:,}" if isinstance(value, int) else f"{key}={value}"
+                               for key, value in span.counts.items())
+            lines.append(f"{'  ' * depth + span.name:<28} {span.wall:8.3f}s wall "
+                         f"{span.cpu:8.3f}s cpu{memory}  {counts}".rstrip())
+        return lines
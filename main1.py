@@ -1,26 +1,22 @@
 # main1.py - Yahoo Finance Big Data Optimization
-import pandas as pd
+import sys
 import numpy as np
-import networkx as nx
-from hmmlearn import hmm
-import matplotlib.pyplot as plt
-from datetime import datetime
-import random
+from streaming_stats import summarize_chunks
 
 print("🚀 YAHOO FINANCE BIG DATA OPTIMIZATION")
 print("======================================")
 
 class FinanceDataOptimizer:
     def __init__(self):
-        self.graph = nx.DiGraph()
         self.data = None
         
     def load_yahoo_data(self, file_path):
         """Load your Yahoo Finance dataset"""
         print(f"📊 Loading dataset: {file_path}")
         
-        # Load your CSV file
-        self.data = pd.read_csv(file_path)
+        # Load your CSV file (served from the columnar cache when fresh)
+        from data_cache import load_dataset  # pandas loads with the first dataset
+        self.data = load_dataset(file_path)
         
         print("✅ Dataset loaded successfully!")
         print(f"   Shape: {self.data.shape}")
@@ -50,28 +46,59 @@ class FinanceDataOptimizer:
             if col in self.data.columns:
                 print(f"  {col}: mean={self.data[col].mean():.2f}, std={self.data[col].std():.2f}")
     
-    def run_analysis(self, file_path):
-        """Run complete analysis"""
+    def analyze_finance_data_streaming(self, file_path, chunksize=100_000):
+        """Analyze the financial data in bounded-size chunks (one pass)"""
+        print(f"📊 Streaming dataset: {file_path} (chunks of {chunksize} rows)")
+        from data_cache import iter_dataset_chunks
+        
+        stats, n_rows, columns = summarize_chunks(
+            iter_dataset_chunks(file_path, chunksize=chunksize))
+        
+        print("\n📈 FINANCIAL DATA ANALYSIS:")
+        print("==========================")
+        
+        # Basic info
+        print(f"Dataset size: {(n_rows, len(columns))}")
+        
+        # Numeric columns analysis
+        numeric_cols = list(stats)
+        print(f"\nNumeric columns: {numeric_cols}")
+        
+        for col in numeric_cols[:5]:
+            print(f"  {col}: mean={stats[col].mean:.2f}, std={stats[col].std():.2f}")
+        
+        return {col: col_stats.as_dict() for col, col_stats in stats.items()}
+    
+    def run_analysis(self, file_path, chunksize=None):
+        """Run complete analysis (streaming when chunksize is given)"""
         print("Starting Yahoo Finance Analysis...")
         print("=" * 50)
         
-        # 1. Load data
-        self.load_yahoo_data(file_path)
-        
-        # 2. Analyze data
-        self.analyze_finance_data()
+        if chunksize:
+            self.analyze_finance_data_streaming(file_path, chunksize)
+        else:
+            # 1. Load data
+            self.load_yahoo_data(file_path)
+            
+            # 2. Analyze data
+            self.analyze_finance_data()
         
         print("\n🎉 ANALYSIS COMPLETE!")
         print("Next: We'll add graph and HMM models")
 
 def main():
+    # usage: python main1.py [DATA.csv] [--chunksize N]
     optimizer = FinanceDataOptimizer()
+    args = sys.argv[1:]
+    chunksize = int(args[args.index('--chunksize') + 1]) if '--chunksize' in args else None
+    paths = [a for i, a in enumerate(args)
+             if not a.startswith('--') and (i == 0 or args[i - 1] != '--chunksize')]
     
     # Use the exact filename
-    file_path = "Yahoo_Finance_2018_2023.csv"
+    file_path = paths[0] if paths else "Yahoo_Finance_2018_2023.csv"
     
     try:
-        optimizer.run_analysis(file_path)
+        optimizer.run_analysis(file_path, chunksize=chunksize)
     except FileNotFoundError:
         print(f"❌ FILE NOT FOUND: {file_path}")
         print("Please make sure the file is in the same folder as this script")
@@ -1,72 +1,136 @@
 # main4.py - FIXED Financial Optimization
-import pandas as pd
+import importlib
 import numpy as np
-import networkx as nx
-from hmmlearn import hmm
-import matplotlib.pyplot as plt
 import random
+import sys
+from features import build_feature_matrix
+from regime import OnlineRegimeFilter, neutral_regime, regime_names, regime_kind
+from strategy_scoring import DEFAULT_CONSTRAINTS
+from model_store import HMMModelStore, fit_hmm_cached
+from instrumentation import Tracer
+# pandas, networkx, scipy and hmmlearn are imported by the stage that first
+# needs them, so importing this module (or a short job) starts fast
+# The stages' lazy imports; run_complete_optimization loads them in their
+# own span so the stage spans time only the stages' work
+STAGE_MODULES = ('data_cache', 'networkx', 'correlation_graph', 'strategy_store',
+                 'hmmlearn.hmm', 'allocation', 'path_engine')
 
 print("🚀 FINANCIAL OPTIMIZATION - FIXED VERSION")
 print("=========================================")
 
 class FixedFinancialOptimizer:
     def __init__(self):
-        self.graph = nx.DiGraph()
+        # networkx graph of the strategy network (build_optimization_network)
+        self.graph = None
+        # CSR view of the graph used by path finding (see correlation_graph)
+        self.sparse_graph = None
+        self.path_engine = None
+        # Columnar node attributes for vectorized filtering/scoring
+        self.strategy_store = None
         self.data = None
+        # Observation columns fed to the HMM (see features.AVAILABLE_FEATURES)
+        self.features = ('return',)
+        self.hmm_model = None
+        self.observations = None
+        self.model_store = HMMModelStore()
+        # Set select_regimes to choose the state count by BIC over restarts
+        self.select_regimes = False
+        self.regime_candidates = range(2, 7)
+        self.state_names = regime_names(3)
+        self.regime_filter = None
+        # Nested stage spans (wall/CPU/peak memory); run_complete_optimization
+        # starts a fresh tracer, with peak-memory tracking when trace_memory is
+        # set (opt-in: tracemalloc makes the run several times slower)
+        self.tracer = Tracer(memory=False)
+        self.trace_memory = False
         
     def load_data_fixed(self, file_path):
         """Load and clean data"""
         print("📊 Loading data...")
-        self.data = pd.read_csv(file_path)
+        from data_cache import load_dataset
+        
+        with self.tracer.span('read') as span:
+            # Typed columnar cache: clean names, parsed dates, ascending order
+            self.data = load_dataset(file_path)
+            span.count(rows=len(self.data))
         
         print(f"✅ Data loaded: {self.data.shape}")
         print(f"   Columns: {list(self.data.columns)}")
         
-        # Simple column cleaning
-        self.data.columns = [col.replace('*', '').replace('**', '').strip() 
-                           for col in self.data.columns]
-        
-        self.data = self.data.dropna()
+        with self.tracer.span('clean') as span:
+            self.data = self.data.dropna()
+            span.count(rows=len(self.data))
         print(f"   Cleaned: {len(self.data)} rows, {len(self.data.columns)} columns")
         return self.data
     
     def build_optimization_network(self):
         """Build constraint-aware network"""
         print("\n🕸️ Building optimization network...")
+        import networkx as nx
+        from correlation_graph import SparseStrategyGraph
+        from strategy_store import StrategyStore
         
-        # Create nodes for different investment strategies
-        strategies = [
-            'Conservative', 'Moderate', 'Aggressive',
-            'Tech_Focus', 'Diversified', 'Growth', 'Value'
-        ]
-        
-        # Add nodes with constraints
-        for strategy in strategies:
-            self.graph.add_node(strategy,
-                              max_risk=random.uniform(0.1, 0.8),
-                              expected_return=random.uniform(0.05, 0.15),
-                              liquidity=random.choice(['High', 'Medium', 'Low']))
-        
-        # Create constrained connections
-        edges = [
-            ('Conservative', 'Moderate', 0.7),
-            ('Moderate', 'Aggressive', 0.6),
-            ('Conservative', 'Diversified', 0.8),
-            ('Moderate', 'Growth', 0.75),
-            ('Aggressive', 'Tech_Focus', 0.9),
-            ('Diversified', 'Value', 0.65)
-        ]
-        
-        for source, target, weight in edges:
-            self.graph.add_edge(source, target, 
-                              weight=weight,
-                              transition_cost=random.uniform(0.01, 0.05),
-                              constraint_level=random.choice(['Low', 'Medium', 'High']))
+        with self.tracer.span('graph_build') as span:
+            self.graph = nx.DiGraph()
+            # Create nodes for different investment strategies
+            strategies = [
+                'Conservative', 'Moderate', 'Aggressive',
+                'Tech_Focus', 'Diversified', 'Growth', 'Value'
+            ]
+            
+            # Add nodes with constraints
+            for strategy in strategies:
+                self.graph.add_node(strategy,
+                                  max_risk=random.uniform(0.1, 0.8),
+                                  expected_return=random.uniform(0.05, 0.15),
+                                  liquidity=random.choice(['High', 'Medium', 'Low']))
+            
+            # Create constrained connections
+            edges = [
+                ('Conservative', 'Moderate', 0.7),
+                ('Moderate', 'Aggressive', 0.6),
+                ('Conservative', 'Diversified', 0.8),
+                ('Moderate', 'Growth', 0.75),
+                ('Aggressive', 'Tech_Focus', 0.9),
+                ('Diversified', 'Value', 0.65)
+            ]
+            
+            for source, target, weight in edges:
+                self.graph.add_edge(source, target, 
+                                  weight=weight,
+                                  transition_cost=random.uniform(0.01, 0.05),
+                                  constraint_level=random.choice(['Low', 'Medium', 'High']))
+            
+            self.sparse_graph = SparseStrategyGraph.from_networkx(self.graph)
+            self.strategy_store = StrategyStore.from_graph(self.sparse_graph)
+            span.count(nodes=self.graph.number_of_nodes(), edges=self.graph.number_of_edges())
         
         print(f"✅ Network built: {self.graph.number_of_nodes()} strategies")
         print(f"   Connections: {self.graph.number_of_edges()}")
         return self.graph
     
+    def build_correlation_network(self, universe, threshold=0.5, k=None, price_col='Close'):
+        """Build the graph from data: tickers linked by return correlation
+        
+        ``universe`` is ``{ticker: DataFrame}`` (see batch_training.load_universe).
+        Edges keep correlations >= threshold, or each ticker's k most
+        correlated peers when k is given.
+        """
+        print("\n🕸️ Building correlation network...")
+        from correlation_graph import build_correlation_graph, returns_panel
+        from strategy_store import StrategyStore
+        
+        returns = returns_panel(universe, price_col=price_col)
+        volumes = {ticker: data['Volume'].mean() for ticker, data in universe.items()
+                   if 'Volume' in data.columns}
+        self.sparse_graph = build_correlation_graph(returns, threshold=threshold, k=k,
+                                                    volumes=volumes or None)
+        self.strategy_store = StrategyStore.from_graph(self.sparse_graph)
+        
+        print(f"✅ Network built: {self.sparse_graph.number_of_nodes()} tickers")
+        print(f"   Connections: {self.sparse_graph.number_of_edges()}")
+        return self.sparse_graph
+    
     def train_fixed_hmm(self):
         """Train HMM with proper data shaping"""
         print("\n🔮 Training market state model...")
@@ -74,40 +138,50 @@ class FixedFinancialOptimizer:
         try:
             # Use Close price for analysis
             price_col = 'Close' if 'Close' in self.data.columns else self.data.columns[4]
-            prices = self.data[price_col].values
-            
-            # Calculate returns properly
-            returns = []
-            for i in range(1, len(prices)):
-                ret = (prices[i] - prices[i-1]) / prices[i-1]
-                returns.append(ret)
+            # Vectorized features with a single fused validity mask
+            with self.tracer.span('features') as span:
+                X, _ = build_feature_matrix(self.data, self.features, price_col=price_col)
+                span.count(observations=len(X))
             
-            returns = np.array(returns)
+            print(f"   Returns data: {len(X)} points")
             
-            # Remove outliers and ensure proper shape
-            returns = returns[~np.isnan(returns)]
-            returns = returns[~np.isinf(returns)]
-            returns = returns[np.abs(returns) < 0.1]  # Remove extreme moves
-            
-            print(f"   Returns data: {len(returns)} points")
-            
-            if len(returns) < 10:
+            if len(X) < 10:
                 print("❌ Not enough data")
                 return np.array([])
             
-            # RESHAPE PROPERLY for HMM
-            X = returns.reshape(-1, 1)  # This is the fix!
-            
-            # Train HMM
-            model = hmm.GaussianHMM(
-                n_components=3,
-                covariance_type="diag",
-                n_iter=100
-            )
-            model.fit(X)
+            with self.tracer.span('hmm_fit') as span:
+                if self.select_regimes:
+                    from model_selection import select_n_regimes
+                    
+                    # Parallel random restarts per state count, chosen by BIC
+                    selection = select_n_regimes(X, candidates=self.regime_candidates)
+                    model = selection['model']
+                    print(f"   Selected {selection['n_components']} market states by BIC")
+                else:
+                    # Train HMM (or reload it if this data was already fitted)
+                    model, cached = fit_hmm_cached(
+                        X,
+                        n_components=3,
+                        covariance_type="diag",
+                        n_iter=100,
+                        features=self.features,
+                        store=self.model_store
+                    )
+                    span.count(cached=int(cached))
+                    if cached:
+                        print("♻️ Reusing cached HMM fit")
+                span.count(states=model.n_components)
+            self.hmm_model = model
+            self.observations = X
+            self.state_names = regime_names(model.n_components)
             
-            # Predict states
-            states = model.predict(X)
+            with self.tracer.span('hmm_predict') as span:
+                # Keep the forward-filter state so new bars need no refit
+                self.regime_filter = OnlineRegimeFilter(model).prime(X)
+                
+                # Predict states ordered by mean return (0 = most bearish)
+                states = self.regime_filter.to_regimes(model.predict(X))
+                span.count(observations=len(states))
             
             print("✅ HMM trained successfully!")
             print(f"   Market states: {np.unique(states)}")
@@ -119,17 +193,37 @@ class FixedFinancialOptimizer:
             print(f"❌ HMM training failed: {e}")
             return np.array([])
     
+    def update_market_state(self, observation):
+        """Update the current regime with one new feature row (no refit)"""
+        if self.regime_filter is None:
+            raise RuntimeError("train_fixed_hmm must run before update_market_state")
+        return self.regime_filter.update(observation)
+    
+    def score_rolling_windows(self, window=60, step=1):
+        """Score/decode every rolling window of the training data in one batch"""
+        if self.hmm_model is None:
+            raise RuntimeError("train_fixed_hmm must run before score_rolling_windows")
+        
+        from batch_hmm import BatchHMMEngine, sliding_windows
+        
+        windows = sliding_windows(self.observations, window, step)
+        engine = BatchHMMEngine(self.hmm_model)
+        log_likelihood, posteriors = engine.posteriors(windows)
+        _, paths = engine.viterbi(windows)
+        
+        return {
+            'log_likelihood': log_likelihood,
+            'posteriors': posteriors,
+            'states': self.regime_filter.to_regimes(paths)
+        }
+    
     def constraint_aware_optimization(self, states):
         """Perform constraint-aware optimization"""
+        self._require_network('constraint_aware_optimization')
         print("\n⚡ Running constraint-aware optimization...")
         
         # Define constraints
-        constraints = {
-            'max_risk': 0.5,
-            'min_return': 0.08,
-            'max_transaction_cost': 0.03,
-            'liquidity': 'Medium'
-        }
+        constraints = dict(DEFAULT_CONSTRAINTS)
         
         print("📋 Optimization Constraints:")
         for key, value in constraints.items():
@@ -138,35 +232,16 @@ class FixedFinancialOptimizer:
         # Get current market state
         if len(states) > 0:
             current_state = states[-1]
-            state_names = ['Bearish', 'Neutral', 'Bullish']
-            print(f"   Current Market: {state_names[current_state]}")
+            market = regime_kind(current_state, len(self.state_names))
+            print(f"   Current Market: {self.state_names[current_state]}")
         else:
-            current_state = 1
+            market = 'Neutral'
             print(f"   Current Market: Neutral (default)")
         
         # Optimize based on constraints and state
-        optimal_strategies = []
-        for node in self.graph.nodes():
-            node_data = self.graph.nodes[node]
-            
-            # Check constraints
-            if (node_data['max_risk'] <= constraints['max_risk'] and
-                node_data['expected_return'] >= constraints['min_return'] and
-                node_data['liquidity'] in [constraints['liquidity'], 'High']):
-                
-                # Adjust for market state
-                if current_state == 0:  # Bearish
-                    score = node_data['expected_return'] - node_data['max_risk']
-                elif current_state == 2:  # Bullish
-                    score = node_data['expected_return']
-                else:  # Neutral
-                    score = (node_data['expected_return'] + 
-                           (1 - node_data['max_risk'])) / 2
-                
-                optimal_strategies.append((node, score, node_data))
-        
-        # Sort by score
-        optimal_strategies.sort(key=lambda x: x[1], reverse=True)
+        with self.tracer.span('rank') as span:
+            optimal_strategies = self.strategy_store.ranked(market, constraints)
+            span.count(strategies=len(self.strategy_store), feasible=len(optimal_strategies))
         
         print("\n🎯 OPTIMAL STRATEGIES (Constraint-Aware):")
         for i, (strategy, score, data) in enumerate(optimal_strategies[:3]):
@@ -176,82 +251,148 @@ class FixedFinancialOptimizer:
             print(f"      Liquidity: {data['liquidity']}")
             print(f"      Score: {score:.3f}")
         
+        # Position sizes over the feasible strategies (already liquidity-filtered)
+        from allocation import allocate
+        
+        with self.tracer.span('allocation') as span:
+            allocation = allocate(
+                [{'name': name, 'return': data['expected_return'], 'risk': data['max_risk'],
+                  'liquidity': data['liquidity']} for name, _, data in optimal_strategies],
+                constraints['max_risk'], constraints['min_return'], max_count=len(optimal_strategies),
+                liquidity_mix=None)
+            span.count(positions=0 if allocation is None else len(allocation['weights']))
+        if allocation is not None:
+            print("\n⚖️ CONTINUOUS ALLOCATION:")
+            for name, weight in allocation['weights'].items():
+                print(f"   {name}: {weight:.1%}")
+        
         return optimal_strategies
     
-    def find_optimal_paths_constrained(self):
-        """Find optimal paths considering constraints"""
+    def _require_network(self, method):
+        # The network is built on demand, not in __init__
+        if self.sparse_graph is None:
+            raise RuntimeError(f"build_optimization_network or build_correlation_network "
+                               f"must run before {method}")
+    
+    def update_transition_costs(self, changes):
+        """Apply ``{(source, target): new_cost}`` without rebuilding the graph
+        
+        Cached shortest-path trees are repaired incrementally; only the
+        parts below changed edges are recomputed.
+        """
+        self._require_network('update_transition_costs')
+        edges = list(changes)
+        for source, target in edges:
+            if self.graph is not None and self.graph.has_edge(source, target):
+                self.graph[source][target]['transition_cost'] = changes[(source, target)]
+        costs = [changes[edge] for edge in edges]
+        if self.path_engine is not None and self.path_engine.graph is self.sparse_graph:
+            return self.path_engine.update_edges(edges, transition_cost=costs)
+        self.sparse_graph.update_edges(edges, transition_cost=costs)
+        return {'trees': 0, 'nodes': 0}
+    
+    def update_strategy(self, name, **attributes):
+        """Change a strategy's expected_return / max_risk / liquidity in place"""
+        from strategy_store import StrategyStore
+        
+        self._require_network('update_strategy')
+        if self.graph is not None and name in self.graph:
+            self.graph.nodes[name].update(attributes)
+        self.sparse_graph.update_node(name, **attributes)
+        self.strategy_store = StrategyStore.from_graph(self.sparse_graph)
+    
+    def find_optimal_paths_constrained(self, max_constraint_level=None, max_steps=None,
+                                       start_nodes=None, target_nodes=None):
+        """Find optimal paths considering constraints
+        
+        Without caps every start gets one shortest-path tree serving all
+        targets; with ``max_constraint_level`` (sum of edge levels, Low=1
+        .. High=3) or ``max_steps`` each pair is routed under those caps.
+        ``start_nodes``/``target_nodes`` default to the strategy network's
+        conservative starts and growth targets.
+        """
         print("\n🧭 Finding constrained optimal paths...")
         
-        if self.graph.number_of_nodes() == 0:
+        if self.sparse_graph is None or self.sparse_graph.number_of_nodes() == 0:
             return []
         
+        if self.path_engine is None or self.path_engine.graph is not self.sparse_graph:
+            from path_engine import PathEngine
+            self.path_engine = PathEngine(self.sparse_graph)
+        
         # Find paths from conservative to optimal strategies
-        try:
+        if start_nodes is None:
             start_nodes = ['Conservative', 'Diversified']
+        if target_nodes is None:
             target_nodes = ['Growth', 'Aggressive', 'Tech_Focus']
+        
+        with self.tracer.span('path_search') as span:
+            if max_constraint_level is None and max_steps is None:
+                optimal_paths = self.path_engine.shortest_paths(start_nodes, target_nodes)
+            else:
+                optimal_paths = []
+                for start in start_nodes:
+                    for target in target_nodes:
+                        if start in self.sparse_graph and target in self.sparse_graph:
+                            path_info = self.path_engine.constrained_path(
+                                start, target, max_level=max_constraint_level, max_steps=max_steps)
+                            if path_info is not None:
+                                optimal_paths.append(path_info)
+                # Sort by total cost
+                optimal_paths.sort(key=lambda x: x['total_cost'])
+            span.count(pairs=len(start_nodes) * len(target_nodes), paths=len(optimal_paths))
+        
+        print("📊 CONSTRAINED OPTIMAL PATHS:")
+        for i, path_info in enumerate(optimal_paths[:2]):
+            print(f"   {i+1}. {' → '.join(path_info['path'])}")
+            print(f"      Cost: {path_info['total_cost']:.3f}")
+            print(f"      Steps: {path_info['steps']}")
+        
+        return optimal_paths
+    
+    def run_complete_optimization(self, file_path, trace_path=None):
+        """Run complete constraint-aware optimization
+        
+        Every stage and sub-step is a span of ``self.tracer``; the span tree
+        (wall/CPU seconds, peak memory, counts) is returned under
+        ``'timings'`` and, with ``trace_path``, written as a trace-event file.
+        """
+        print("Starting Constraint-Aware Optimization...")
+        print("=" * 50)
+        self.tracer = Tracer(memory=self.trace_memory)
+        
+        with self.tracer.span('run_complete_optimization'):
+            with self.tracer.span('imports') as span:
+                for name in STAGE_MODULES:
+                    importlib.import_module(name)
+                span.count(modules=len(STAGE_MODULES))
             
-            optimal_paths = []
-            
-            for start in start_nodes:
-                for target in target_nodes:
-                    if start in self.graph and target in self.graph:
-                        try:
-                            # Find path with minimum transaction costs
-                            path = nx.shortest_path(self.graph, start, target, 
-                                                  weight='transition_cost')
-                            
-                            # Calculate path metrics
-                            total_cost = sum(self.graph[path[i]][path[i+1]]['transition_cost'] 
-                                           for i in range(len(path)-1))
-                            avg_constraint = np.mean([
-                                1 if self.graph[path[i]][path[i+1]]['constraint_level'] == 'Low' else
-                                2 if self.graph[path[i]][path[i+1]]['constraint_level'] == 'Medium' else 3
-                                for i in range(len(path)-1)
-                            ])
-                            
-                            optimal_paths.append({
-                                'path': path,
-                                'total_cost': total_cost,
-                                'constraint_level': avg_constraint,
-                                'steps': len(path)
-                            })
-                        except:
-                            continue
+            # 1. Load data
+            with self.tracer.span('load_data'):
+                self.load_data_fixed(file_path)
             
-            # Sort by total cost
-            optimal_paths.sort(key=lambda x: x['total_cost'])
+            # 2. Build network
+            with self.tracer.span('build_network'):
+                self.build_optimization_network()
             
-            print("📊 CONSTRAINED OPTIMAL PATHS:")
-            for i, path_info in enumerate(optimal_paths[:2]):
-                print(f"   {i+1}. {' → '.join(path_info['path'])}")
-                print(f"      Cost: {path_info['total_cost']:.3f}")
-                print(f"      Steps: {path_info['steps']}")
+            # 3. Train HMM
+            with self.tracer.span('train_hmm'):
+                states = self.train_fixed_hmm()
             
-            return optimal_paths
+            # 4. Constraint-aware optimization
+            with self.tracer.span('optimize'):
+                strategies = self.constraint_aware_optimization(states)
             
-        except Exception as e:
-            print(f"   Path finding error: {e}")
-            return []
-    
-    def run_complete_optimization(self, file_path):
-        """Run complete constraint-aware optimization"""
-        print("Starting Constraint-Aware Optimization...")
-        print("=" * 50)
-        
-        # 1. Load data
-        self.load_data_fixed(file_path)
-        
-        # 2. Build network
-        self.build_optimization_network()
-        
-        # 3. Train HMM
-        states = self.train_fixed_hmm()
-        
-        # 4. Constraint-aware optimization
-        strategies = self.constraint_aware_optimization(states)
+            # 5. Find optimal paths
+            with self.tracer.span('find_paths'):
+                paths = self.find_optimal_paths_constrained()
         
-        # 5. Find optimal paths
-        paths = self.find_optimal_paths_constrained()
+        print("\n⏱️ STAGE TIMINGS:")
+        for line in self.tracer.summary_lines():
+            print(f"   {line}")
+        if trace_path is not None:
+            self.tracer.write_trace(trace_path)
+            print(f"   Trace written to '{trace_path}'")
         
         print("\n🎉 CONSTRAINT-AWARE OPTIMIZATION COMPLETE!")
         print("✅ Big Data: Processed")
@@ -263,11 +404,15 @@ class FixedFinancialOptimizer:
         return {
             'strategies': strategies,
             'paths': paths,
-            'market_state': states[-1] if len(states) > 0 else 1
+            # Without states, the Neutral regime of the current labelling (None for K=2)
+            'market_state': states[-1] if len(states) > 0 else neutral_regime(len(self.state_names)),
+            'timings': self.tracer.to_dict()
         }
 
 def main():
+    # usage: python main2.py [--trace-memory]
     optimizer = FixedFinancialOptimizer()
+    optimizer.trace_memory = '--trace-memory' in sys.argv
     
     try:
         results = optimizer.run_complete_optimization("Yahoo_Finance_2018_2023.csv")
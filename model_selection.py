@@ -0,0 +1,92 @@
+# model_selection.py - Multi-restart EM and BIC/AIC choice of the number of regimes
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CRITERIA = ('bic', 'aic')
+
+
+def fit_restart(X, n_components, covariance_type, n_iter, seed):
+    """One EM run from a random initialization; returns (log_likelihood, model)"""
+    from hmmlearn import hmm
+    
+    model = hmm.GaussianHMM(n_components=n_components,
+                            covariance_type=covariance_type,
+                            n_iter=n_iter,
+                            random_state=seed)
+    try:
+        model.fit(X)
+        return model.score(X), model
+    except (ValueError, np.linalg.LinAlgError):
+        # Degenerate initialization (e.g. a collapsed covariance)
+        return -np.inf, None
+
+
+def select_n_regimes(X, candidates=range(2, 7), n_restarts=8, criterion='bic',
+                     covariance_type='diag', n_iter=100, processes=None, tol=1e-4,
+                     seed=0):
+    """Pick the number of HMM states by BIC/AIC over parallel random restarts
+
+    Restarts for every candidate state count run in waves on a process
+    pool. A candidate stops early once a wave improves its best
+    log-likelihood by less than ``tol`` per observation, or after
+    ``n_restarts`` restarts. Returns a dict with the winning ``model``, its
+    ``n_components`` and a per-candidate ``table``.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}")
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    candidates = [k for k in candidates if len(X) > 10 * k]
+    if not candidates:
+        raise ValueError("Not enough observations for any candidate state count")
+
+    processes = processes or os.cpu_count() or 1
+    best = {k: (-np.inf, None) for k in candidates}
+    restarts = dict.fromkeys(candidates, 0)
+    active = list(candidates)
+    next_seed = seed
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        while active:
+            # Spread one wave of restarts over the active candidates
+            per_candidate = max(1, processes // len(active))
+            futures = []
+            for k in active:
+                for _ in range(min(per_candidate, n_restarts - restarts[k])):
+                    futures.append((k, pool.submit(fit_restart, X, k, covariance_type,
+                                                   n_iter, next_seed)))
+                    next_seed += 1
+                    restarts[k] += 1
+
+            previous = {k: best[k][0] for k in active}
+            for k, future in futures:
+                log_likelihood, model = future.result()
+                if model is not None and log_likelihood > best[k][0]:
+                    best[k] = (log_likelihood, model)
+
+            still_active = []
+            for k in active:
+                gain = best[k][0] - previous[k]
+                plateaued = np.isfinite(previous[k]) and gain < tol * len(X)
+                if restarts[k] < n_restarts and not plateaued:
+                    still_active.append(k)
+            active = still_active
+
+    rows = []
+    for k in candidates:
+        log_likelihood, model = best[k]
+        rows.append({
+            'n_components': k,
+            'log_likelihood': log_likelihood,
+            'bic': model.bic(X) if model is not None else np.inf,
+            'aic': model.aic(X) if model is not None else np.inf,
+            'restarts': restarts[k],
+        })
+    table = pd.DataFrame(rows)
+    if not np.isfinite(table[criterion]).any():
+        raise ValueError("Every restart failed to fit")
+
+    winner = int(table.loc[table[criterion].idxmin(), 'n_components'])
+    return {'model': best[winner][1], 'n_components': winner, 'table': table}
@@ -0,0 +1,149 @@
+# model_store.py - On-disk cache of fitted HMMs keyed by data + settings
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+DEFAULT_STORE_DIR = '.hmm_models'
+
+
+class HMMModelStore:
+    """Directory of fitted GaussianHMM parameters with LRU eviction
+
+    Entries are keyed by a fingerprint of the observation matrix and the
+    fit settings. Each entry is a single ``.npz`` file; reading an entry
+    refreshes its mtime, and eviction removes the least recently used files
+    until both ``max_entries`` and ``max_bytes`` are respected.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, max_entries=1000, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def fingerprint(X, **settings):
+        """Stable key for an observation matrix and the HMM settings"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        digest = hashlib.sha256()
+        digest.update(str(X.shape).encode())
+        digest.update(X.tobytes())
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def load(self, key):
+        """Return the stored GaussianHMM for ``key`` or None"""
+        from hmmlearn import hmm  # sklearn-heavy; loaded with the first model
+        
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                settings = json.loads(str(entry['settings']))
+                model = hmm.GaussianHMM(n_components=settings['n_components'],
+                                        covariance_type=settings['covariance_type'],
+                                        n_iter=settings['n_iter'])
+                model.n_features = entry['means'].shape[1]
+                model.startprob_ = entry['startprob']
+                model.transmat_ = entry['transmat']
+                model.means_ = entry['means']
+                model.covars_ = entry['covars']
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            return None  # missing or truncated entry: refit
+        os.utime(path)  # mark as recently used
+        return model
+
+    def save(self, key, model, **settings):
+        """Persist the fitted parameters of ``model`` under ``key``"""
+        os.makedirs(self.directory, exist_ok=True)
+        settings.setdefault('n_components', model.n_components)
+        settings.setdefault('covariance_type', model.covariance_type)
+        settings.setdefault('n_iter', model.n_iter)
+        path = self._path(key)
+        # unique temp name so concurrent writers of one key never share a file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                # _covars_ holds the compact form that the covars_ setter expects
+                np.savez(f, startprob=model.startprob_, transmat=model.transmat_,
+                         means=model.means_, covars=model._covars_,
+                         settings=json.dumps(settings, default=str))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+        return path
+
+    def evict(self):
+        """Drop least recently used entries beyond the count/size budget"""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith('.npz')]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.directory, name))
+
+
+def fit_hmm_cached(X, n_components=3, covariance_type='diag', n_iter=100,
+                   features=('return',), random_state=None, store=None):
+    """Fit a GaussianHMM, reusing a stored fit for identical data and settings
+
+    Returns ``(model, from_cache)``.
+    """
+    settings = {
+        'n_components': n_components,
+        'covariance_type': covariance_type,
+        'n_iter': n_iter,
+        'features': list(features),
+        'random_state': random_state,
+    }
+    key = None
+    if store is not None:
+        key = store.fingerprint(X, **settings)
+        model = store.load(key)
+        if model is not None:
+            return model, True
+
+    from hmmlearn import hmm
+    
+    model = hmm.GaussianHMM(n_components=n_components,
+                            covariance_type=covariance_type,
+                            n_iter=n_iter,
+                            random_state=random_state)
+    model.fit(X)
+
+    if store is not None:
+        try:
+            store.save(key, model, **settings)
+        except OSError as e:
+            print(f"⚠️ Could not cache HMM: {e}")
+    return model, False
@@ -0,0 +1,277 @@
+# path_engine.py - Shortest-path trees and resource-constrained routing over a CSR graph
+import heapq
+
+import numpy as np
+from scipy.sparse import csgraph
+
+
+def _accumulate_to_root(values, predecessors):
+    """Sum ``values`` (value of the edge into each node) along tree paths
+
+    Pointer doubling: after round r every node has added the values of its
+    2**r nearest ancestors, so the loop runs log2(depth) vectorized rounds.
+    """
+    total = values.copy()
+    ancestor = predecessors.copy()
+    while True:
+        has = ancestor >= 0
+        if not has.any():
+            return total
+        total[has] += total[ancestor[has]]
+        ancestor[has] = ancestor[ancestor[has]]
+
+
+def _ranges(indptr, nodes):
+    """Concatenated ``range(indptr[v], indptr[v + 1])`` for every node in ``nodes``"""
+    starts = indptr[nodes]
+    counts = indptr[np.asarray(nodes) + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+
+
+class PathEngine:
+    """Cheapest transition paths on a ``SparseStrategyGraph``
+
+    One Dijkstra run per source (on ``transition_cost``) gives the
+    distances to every target; the constraint-level totals and edge
+    counts along the tree are accumulated once per tree, so a query is a
+    lookup plus a predecessor walk for the node list. Trees are cached per
+    source and repaired in place by ``update_edges``. ``constrained_path``
+    adds caps on the summed constraint level and on the path length.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._trees = {}
+
+    def _index(self, node):
+        if node not in self.graph.index:
+            raise KeyError(f"Unknown node: {node}")
+        return self.graph.index[node]
+
+    def _build_trees(self, sources):
+        missing = [s for s in sources if s not in self._trees]
+        if not missing:
+            return
+        cost = self.graph.transition_cost
+        level = self.graph.constraint_level
+        dist, pred = csgraph.dijkstra(cost, directed=True,
+                                      indices=[self._index(s) for s in missing],
+                                      return_predecessors=True)
+        n = self.graph.number_of_nodes()
+        for source, d, p in zip(missing, np.atleast_2d(dist), np.atleast_2d(pred)):
+            p = np.where(p < 0, -1, p)
+            in_tree = np.flatnonzero(p >= 0)
+            edge_level = np.zeros(n)
+            edge_level[in_tree] = level.data[self.graph.edge_positions(p[in_tree], in_tree)]
+            tree = {'dist': d, 'pred': p, 'edge_level': edge_level}
+            self._accumulate(tree)
+            self._trees[source] = tree
+
+    @staticmethod
+    def _accumulate(tree):
+        p = tree['pred']
+        tree['level'] = _accumulate_to_root(tree['edge_level'], p)
+        tree['edges'] = _accumulate_to_root((p >= 0).astype(np.float64), p).astype(np.int64)
+
+    def tree(self, source):
+        """``{'dist', 'pred', 'level', 'edges', ...}`` arrays over all nodes for ``source``"""
+        self._build_trees([source])
+        return self._trees[source]
+
+    def update_edges(self, edges, transition_cost=None, constraint_level=None):
+        """Change existing edges and repair the cached trees incrementally
+
+        ``edges`` is a list of ``(source, target)`` names; ``transition_cost``
+        and ``constraint_level`` hold the new values (scalar or one per
+        edge). Per cached tree, a cost increase on a tree edge only unsettles
+        the subtree below it: those nodes are re-seeded from their in-edges
+        from the rest of the tree. Increases on other edges change nothing.
+        Decreases seed the same relaxation, which only visits nodes whose
+        distance improves. Level and edge totals are then re-accumulated
+        below the nodes that changed. Returns ``{'trees': n, 'nodes': n}``
+        (trees touched, nodes updated).
+        """
+        graph = self.graph
+        sources, targets, old_cost = graph.update_edges(edges, transition_cost, constraint_level)
+        cost = graph.transition_cost.data
+        new_cost = cost[graph.edge_positions(sources, targets)]
+        increased = new_cost > old_cost
+        decreased = new_cost < old_cost
+
+        summary = {'trees': 0, 'nodes': 0}
+        for tree in self._trees.values():
+            d, p = tree['dist'], tree['pred']
+            on_tree = p[targets] == sources
+            unsettled = np.concatenate(self._subtree_layers(targets[increased & on_tree], p))
+            d[unsettled], p[unsettled] = np.inf, -1
+            entering = graph.in_edges[_ranges(graph.in_ptr, unsettled)]
+            seed_from = np.concatenate((graph.edge_source[entering], sources[decreased]))
+            seed_to = np.concatenate((graph.transition_cost.indices[entering], targets[decreased]))
+            seed_dist = d[seed_from] + np.concatenate((cost[entering], new_cost[decreased]))
+            changed = np.concatenate((self._relax(tree, seed_dist, seed_to, seed_from), unsettled))
+            if constraint_level is not None:
+                changed = np.concatenate((changed, targets[on_tree]))
+            if len(changed):
+                summary['trees'] += 1
+                summary['nodes'] += self._reaccumulate(tree, changed)
+        return summary
+
+    def _subtree_layers(self, roots, pred):
+        """``roots`` and all nodes below them as layers, parents before children"""
+        graph = self.graph
+        below = np.zeros(len(pred), dtype=bool)
+        frontier = np.unique(roots)
+        while len(frontier):
+            below[frontier] = True
+            out = _ranges(graph.transition_cost.indptr, frontier)
+            child = graph.transition_cost.indices[out]
+            frontier = np.unique(child[(pred[child] == graph.edge_source[out]) & ~below[child]])
+
+        # Re-walk from the subtree tops so nested roots come after their parents
+        members = np.flatnonzero(below)
+        parent = pred[members]
+        frontier = members[(parent < 0) | ~below[np.maximum(parent, 0)]]
+        layers = [np.empty(0, dtype=np.int64)]
+        while len(frontier):
+            layers.append(frontier)
+            out = _ranges(graph.transition_cost.indptr, frontier)
+            child = graph.transition_cost.indices[out]
+            frontier = child[pred[child] == graph.edge_source[out]]
+        return layers
+
+    def _reaccumulate(self, tree, changed):
+        """Refresh edge levels of ``changed`` and the totals below them"""
+        p = tree['pred']
+        edge_level, level, edges = tree['edge_level'], tree['level'], tree['edges']
+        layers = self._subtree_layers(changed, p)
+        nodes = np.concatenate(layers)
+        linked = nodes[p[nodes] >= 0]
+        edge_level[nodes] = 0.0
+        edge_level[linked] = self.graph.constraint_level.data[
+            self.graph.edge_positions(p[linked], linked)]
+        level[nodes] = edge_level[nodes]
+        edges[nodes] = 0
+        for layer in layers:
+            linked = layer[p[layer] >= 0]
+            level[linked] += level[p[linked]]
+            edges[linked] = edges[p[linked]] + 1
+        return len(nodes)
+
+    def _relax(self, tree, dist, to, frm):
+        """Label-correcting relaxation from candidate edges, one frontier per round
+
+        Returns the nodes whose distance improved.
+        """
+        d, p = tree['dist'], tree['pred']
+        cost = self.graph.transition_cost
+        changed = []
+        while len(to):
+            better = dist < d[to]
+            dist, to, frm = dist[better], to[better], frm[better]
+            if not len(to):
+                break
+            # Best candidate per node
+            order = np.lexsort((dist, to))
+            dist, to, frm = dist[order], to[order], frm[order]
+            first = np.r_[True, to[1:] != to[:-1]]
+            dist, to, frm = dist[first], to[first], frm[first]
+            d[to], p[to] = dist, frm
+            changed.append(to)
+            out = _ranges(cost.indptr, to)
+            frm = self.graph.edge_source[out]
+            to = cost.indices[out]
+            dist = d[frm] + cost.data[out]
+        return np.concatenate(changed) if changed else np.empty(0, dtype=np.int64)
+
+    def _result(self, path, cost, level_total):
+        edges = len(path) - 1
+        return {
+            'path': path,
+            'total_cost': float(cost),
+            'constraint_level': level_total / edges if edges else 0.0,
+            'constraint_total': float(level_total),
+            'steps': len(path),
+        }
+
+    def shortest_path(self, source, target):
+        """Cheapest path as a result dict, or None if ``target`` is unreachable"""
+        tree = self.tree(source)
+        t = self._index(target)
+        if not np.isfinite(tree['dist'][t]):
+            return None
+        nodes = [t]
+        while nodes[-1] != self.graph.index[source]:
+            nodes.append(int(tree['pred'][nodes[-1]]))
+        path = [self.graph.nodes[i] for i in reversed(nodes)]
+        return self._result(path, tree['dist'][t], tree['level'][t])
+
+    def shortest_paths(self, sources, targets):
+        """Result dicts for every reachable (source, target) pair, cheapest first
+
+        All source trees are computed in one Dijkstra call.
+        """
+        sources = [s for s in sources if s in self.graph]
+        self._build_trees(sources)
+        results = []
+        for source in sources:
+            for target in targets:
+                if target in self.graph:
+                    result = self.shortest_path(source, target)
+                    if result is not None:
+                        results.append(result)
+        results.sort(key=lambda x: x['total_cost'])
+        return results
+
+    def constrained_path(self, source, target, max_level=None, max_steps=None):
+        """Cheapest path whose summed constraint level and length fit the caps
+
+        ``max_level`` caps the sum of edge constraint levels (1 = Low ..
+        3 = High) and ``max_steps`` the number of nodes on the path (the
+        ``steps`` reported). Label-setting search: labels (cost, level,
+        edges) are expanded cheapest first and a label is dropped when an
+        already expanded label at the same node has no more level and no
+        more edges, or when the least level/edge count still needed to
+        reach ``target`` breaks a cap. Returns None when no path fits.
+        """
+        s, t = self._index(source), self._index(target)
+        cost = self.graph.transition_cost
+        level = self.graph.constraint_level
+        max_edges = np.inf if max_steps is None else max_steps - 1
+        max_level = np.inf if max_level is None else max_level
+
+        # Least level and fewest edges from each node to the target
+        level_to_target = csgraph.dijkstra(level.T, directed=True, indices=t)
+        edges_to_target = csgraph.shortest_path(cost.T, directed=True, indices=t,
+                                                unweighted=True)
+
+        indptr, indices = cost.indptr, cost.indices
+        cost_data, level_data = cost.data, level.data
+        labels = [(s, -1)]  # (node, parent label)
+        heap = [(0.0, 0, 0, 0)]  # (cost, level, edges, label id)
+        expanded = {}  # node -> [(level, edges)] of expanded labels
+        while heap:
+            c, lv, e, label = heapq.heappop(heap)
+            node = labels[label][0]
+            front = expanded.setdefault(node, [])
+            if any(l2 <= lv and e2 <= e for l2, e2 in front):
+                continue
+            front.append((lv, e))
+            if node == t:
+                nodes = []
+                while label >= 0:
+                    nodes.append(labels[label][0])
+                    label = labels[label][1]
+                path = [self.graph.nodes[i] for i in reversed(nodes)]
+                return self._result(path, c, lv)
+            for k in range(indptr[node], indptr[node + 1]):
+                nxt = indices[k]
+                n_lv, n_e = lv + int(level_data[k]), e + 1
+                if (n_lv + level_to_target[nxt] > max_level or
+                        n_e + edges_to_target[nxt] > max_edges):
+                    continue
+                labels.append((nxt, label))
+                heapq.heappush(heap, (c + cost_data[k], n_lv, n_e, len(labels) - 1))
+        return None
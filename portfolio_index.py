@@ -0,0 +1,112 @@
+# portfolio_index.py - Precomputed dominance index for instant constraint re-queries
+import numpy as np
+
+from portfolio_solver import best_k, liquidity_ratio, subset_totals
+
+# Index builds enumerate all 2**n subsets; beyond this use PortfolioProblem
+INDEX_MAX_STRATEGIES = 16
+
+
+def strategy_key(strategies):
+    """Hashable fingerprint of the strategy attributes an index depends on"""
+    return tuple((s["name"], s["return"], s["risk"], s["liquidity"]) for s in strategies)
+
+
+class PortfolioFrontierIndex:
+    """Portfolios that can appear in the top ``depth`` answer of any query
+
+    A portfolio is dominated by another with at least its return, at most
+    its risk, at least its High-liquidity share and at most its strategy
+    count (and strictly better in one of them). Every query (max_risk,
+    min_return, max_strategies, liquidity_mix) accepted by the dominated
+    portfolio is accepted by its dominator, which also scores at least as
+    well on ``return - risk``. So only portfolios with fewer than ``depth``
+    dominators (the ``depth``-skyband; depth 1 is the Pareto frontier) can
+    be in a top-``depth`` answer, and those are all the index keeps.
+    Queries are then a risk range lookup plus a few masks over that set.
+    ``check()``, if given, is called once per block while building and may
+    raise to abandon the build.
+    """
+
+    def __init__(self, strategies, depth=10, block_size=2048, check=None):
+        self.strategies = list(strategies)
+        if len(self.strategies) > INDEX_MAX_STRATEGIES:
+            raise ValueError(f"Frontier index supports at most {INDEX_MAX_STRATEGIES} strategies")
+        self.key = strategy_key(self.strategies)
+        self.names = [s["name"] for s in self.strategies]
+        self.depth = depth
+        self._build(block_size, check)
+
+    def _build(self, block_size, check=None):
+        masks, ret, risk, count, high = (np.concatenate(parts) for parts in zip(*subset_totals(
+            [s["return"] for s in self.strategies],
+            [s["risk"] for s in self.strategies],
+            [s["liquidity"] == "High" for s in self.strategies])))
+        nonempty = count >= 1
+        masks, ret, risk, count, high = (a[nonempty] for a in (masks, ret, risk, count, high))
+        share = high / np.maximum(count, 1)
+        score = ret - risk
+
+        # Result order: best score first, ties by mask (as PortfolioProblem.top_k)
+        order = np.lexsort((masks, -score))
+        masks, ret, risk, count, high, share, score = (
+            a[order] for a in (masks, ret, risk, count, high, share, score))
+
+        # Only dominators ahead in result order count (float sums can make a
+        # dominator tie on score), so every dominator comes before its
+        # portfolio. One with >= depth of them has >= depth kept ones too
+        # (both relations are transitive), so each block is compared against
+        # the portfolios kept so far plus itself rather than everything before it
+        kept = np.zeros(len(masks), dtype=bool)
+        kept_idx = np.empty(0, dtype=np.intp)
+        for start in range(0, len(masks), block_size):
+            if check is not None:
+                check()
+            block = np.arange(start, min(start + block_size, len(masks)))
+            candidates = np.concatenate((kept_idx, block))
+            ge = ((ret[candidates][None, :] >= ret[block][:, None]) &
+                  (risk[candidates][None, :] <= risk[block][:, None]) &
+                  (share[candidates][None, :] >= share[block][:, None]) &
+                  (count[candidates][None, :] <= count[block][:, None]))
+            strict = ((ret[candidates][None, :] > ret[block][:, None]) |
+                      (risk[candidates][None, :] < risk[block][:, None]) |
+                      (share[candidates][None, :] > share[block][:, None]) |
+                      (count[candidates][None, :] < count[block][:, None]))
+            ahead = candidates[None, :] < block[:, None]
+            kept[block] = (ge & strict & ahead).sum(axis=1) < self.depth
+            kept_idx = np.flatnonzero(kept)
+
+        # Store the skyband sorted by risk for range lookups
+        kept_idx = kept_idx[np.lexsort((-score[kept_idx], risk[kept_idx]))]
+        self.masks = masks[kept_idx]
+        self.total_return = ret[kept_idx]
+        self.total_risk = risk[kept_idx]
+        self.count = count[kept_idx]
+        self.high = high[kept_idx]
+        self.score = score[kept_idx]
+        self.n_subsets = len(masks)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def positions(self, max_risk, min_return, max_strategies, liquidity_mix, k=10):
+        """Positions of the top ``k`` feasible portfolios in the index arrays, best first"""
+        if k > self.depth:
+            raise ValueError(f"Index was built for at most {self.depth} results")
+        end = np.searchsorted(self.total_risk, max_risk, side='right')
+        ret, count, high = self.total_return[:end], self.count[:end], self.high[:end]
+        feasible = np.flatnonzero((ret >= min_return) &
+                                  (count <= max_strategies) &
+                                  (high >= count * liquidity_ratio(liquidity_mix)))
+        return feasible[best_k(self.score[feasible], self.masks[feasible], k)]
+
+    def query(self, max_risk, min_return, max_strategies, liquidity_mix, k=10):
+        """Top ``k`` feasible portfolios by ``return - risk`` as ``{name: 0/1}``"""
+        feasible = self.positions(max_risk, min_return, max_strategies, liquidity_mix, k)
+        return [{name: (int(mask) >> i) & 1 for i, name in enumerate(self.names)}
+                for mask in self.masks[feasible]]
+
+    def answer(self, problem, k=10):
+        """Answer the query described by a PortfolioProblem"""
+        return self.query(problem.max_risk, problem.min_return, problem.max_count,
+                          problem.liquidity_mix, k)
@@ -0,0 +1,308 @@
+# portfolio_solver.py - Branch-and-bound solver for CSP strategy subset selection
+import heapq
+from itertools import count as _counter
+
+import numpy as np
+
+# Minimum share of High-liquidity strategies for each liquidity mix
+LIQUIDITY_RATIOS = {'Conservative': 0.7, 'Balanced': 0.4, 'Aggressive': 0.2}
+LIQUIDITY_SCORES = {'High': 3, 'Medium': 2, 'Low': 1}
+
+# The GUI's strategy universe (name, expected return, risk, liquidity)
+DEFAULT_STRATEGIES = [
+    {"name": "CONSERVATIVE", "return": 0.06, "risk": 0.2, "liquidity": "High"},
+    {"name": "MODERATE", "return": 0.09, "risk": 0.4, "liquidity": "Medium"},
+    {"name": "AGGRESSIVE", "return": 0.15, "risk": 0.7, "liquidity": "Low"},
+    {"name": "TECH FOCUS", "return": 0.12, "risk": 0.6, "liquidity": "Medium"},
+    {"name": "DIVERSIFIED", "return": 0.08, "risk": 0.3, "liquidity": "High"},
+    {"name": "GROWTH", "return": 0.11, "risk": 0.5, "liquidity": "Medium"},
+    {"name": "VALUE", "return": 0.07, "risk": 0.25, "liquidity": "High"},
+    {"name": "INCOME", "return": 0.05, "risk": 0.15, "liquidity": "High"},
+    {"name": "BLUE CHIP", "return": 0.085, "risk": 0.35, "liquidity": "High"}
+]
+
+# Largest strategy set enumerated exhaustively as bitmasks (2**25 subsets)
+BITMASK_MAX_STRATEGIES = 25
+
+# Heap pops between calls of a ``check`` hook in iter_best
+CHECK_EVERY = 1024
+
+# Slack for bounds that are not computed in the same order as the exact check
+_EPS = 1e-9
+
+
+def liquidity_ratio(liquidity_mix):
+    """Required High-liquidity share; unknown mixes behave like Aggressive"""
+    return LIQUIDITY_RATIOS.get(liquidity_mix, LIQUIDITY_RATIOS['Aggressive'])
+
+
+def subset_totals(returns, risks, high, chunk_size=1 << 20):
+    """Totals for all 2**n strategy subsets, in chunks of bitmasks
+
+    Subset ``m`` includes strategy ``i`` when bit ``i`` of ``m`` is set.
+    Totals are accumulated strategy by strategy in index order, which gives
+    bit-for-bit the same sums as the exact per-solution check. Each chunk
+    covers every combination of the low strategies for one fixed choice of
+    the high ones. Yields ``(masks, total_return, total_risk, count,
+    n_high)``.
+    """
+    n = len(returns)
+    if n > BITMASK_MAX_STRATEGIES:
+        raise ValueError(f"Bitmask mode supports at most {BITMASK_MAX_STRATEGIES} strategies")
+    returns = np.asarray(returns, dtype=np.float64)
+    risks = np.asarray(risks, dtype=np.float64)
+    high = np.asarray(high, dtype=np.int64)
+
+    # Totals for every subset of the low strategies, built by appending
+    # strategy i to all subsets of strategies < i (so sums run in index order)
+    low_bits = min(n, max(int(chunk_size).bit_length() - 1, 0))
+    low_return, low_risk = np.zeros(1), np.zeros(1)
+    low_count, low_high = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    for i in range(low_bits):
+        low_return = np.concatenate((low_return, low_return + returns[i]))
+        low_risk = np.concatenate((low_risk, low_risk + risks[i]))
+        low_count = np.concatenate((low_count, low_count + 1))
+        low_high = np.concatenate((low_high, low_high + high[i]))
+
+    low_masks = np.arange(1 << low_bits, dtype=np.int64)
+    for start in range(0, 1 << n, 1 << low_bits):
+        # The high strategies are fixed within a chunk: add them afterwards
+        total_return, total_risk = low_return, low_risk
+        count, n_high = low_count, low_high
+        for i in range(low_bits, n):
+            if (start >> i) & 1:
+                total_return = total_return + returns[i]
+                total_risk = total_risk + risks[i]
+                count = count + 1
+                n_high = n_high + high[i]
+        yield start + low_masks, total_return, total_risk, count, n_high
+
+
+def best_k(scores, masks, k):
+    """Indices of the ``k`` best entries: highest score first, ties by smallest mask
+
+    Partitions around the k-th score and sorts only what ties with or
+    beats it, so ties at the cut-off are resolved by mask too.
+    """
+    candidates = np.arange(len(scores))
+    if len(scores) > k:
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero(scores >= kth)
+    return candidates[np.lexsort((masks[candidates], -scores[candidates]))][:k]
+
+
+class PortfolioProblem:
+    """Include/exclude each strategy subject to the four portfolio constraints
+
+    The constraints are the ones the GUI used to register with
+    python-constraint: total risk <= max_risk, total return >= min_return,
+    1 <= count <= max_count and a minimum share of High-liquidity
+    strategies. Partial assignments are pruned with bounds on the remaining
+    risk budget, the best reachable return, the count cap and the best
+    reachable liquidity share, and every complete assignment is verified
+    with the exact original checks.
+    """
+
+    def __init__(self, strategies, max_risk, min_return, max_count, liquidity_mix):
+        self.strategies = list(strategies)
+        self.names = [s["name"] for s in self.strategies]
+        self.returns = [s["return"] for s in self.strategies]
+        self.risks = [s["risk"] for s in self.strategies]
+        self.high = [s["liquidity"] == "High" for s in self.strategies]
+        self.max_risk = max_risk
+        self.min_return = min_return
+        self.max_count = max_count
+        self.liquidity_mix = liquidity_mix
+        self.ratio = liquidity_ratio(liquidity_mix)
+        self._precompute_bounds()
+
+    def _precompute_bounds(self):
+        n = len(self.strategies)
+        # Most negative risk still addable from position i onwards
+        self._risk_floor = [0.0] * (n + 1)
+        self._high_left = [0] * (n + 1)
+        # _best_gain[i][c]: largest return reachable with c more picks from i
+        self._best_gain = self._top_sums(self.returns)
+        # Same for the portfolio score (return - risk) used by iter_best
+        self._best_score = self._top_sums([r - k for r, k in zip(self.returns, self.risks)])
+        for i in range(n - 1, -1, -1):
+            self._risk_floor[i] = self._risk_floor[i + 1] + min(self.risks[i], 0.0)
+            self._high_left[i] = self._high_left[i + 1] + self.high[i]
+
+    @staticmethod
+    def _top_sums(values):
+        """table[i][c] = sum of the c largest positive values in values[i:]"""
+        n = len(values)
+        table = [[0.0] * (n + 1) for _ in range(n + 1)]
+        for i in range(n - 1, -1, -1):
+            gains = sorted((v for v in values[i:] if v > 0), reverse=True)
+            running = 0.0
+            for c in range(1, n + 1):
+                if c <= len(gains):
+                    running += gains[c - 1]
+                table[i][c] = running
+        return table
+
+    def is_feasible(self, selections):
+        """Exact constraint check for a full 0/1 assignment (in strategy order)"""
+        strategies = self.strategies
+        total_risk = sum(strategies[i]["risk"] for i, selected in enumerate(selections) if selected)
+        total_return = sum(strategies[i]["return"] for i, selected in enumerate(selections) if selected)
+        selected_count = sum(selections)
+        high_liquidity = sum(1 for i, selected in enumerate(selections)
+                             if selected and strategies[i]["liquidity"] == "High")
+        return (total_risk <= self.max_risk and
+                total_return >= self.min_return and
+                1 <= selected_count <= self.max_count and
+                high_liquidity >= selected_count * self.ratio)
+
+    def _can_complete(self, i, risk, ret, count, high):
+        """Optimistic feasibility of any completion of the first i choices"""
+        if count > self.max_count:
+            return False
+        if risk + self._risk_floor[i] > self.max_risk + _EPS:
+            return False
+        picks_left = min(self.max_count - count, len(self.strategies) - i)
+        if ret + self._best_gain[i][picks_left] < self.min_return - _EPS:
+            return False
+        # Adding only High-liquidity strategies maximizes the share
+        extra_high = min(self._high_left[i], picks_left)
+        if high + extra_high < (count + extra_high) * self.ratio - _EPS:
+            return False
+        return True
+
+    def iter_solutions(self):
+        """Yield every feasible assignment as ``{name: 0/1}``"""
+        n = len(self.strategies)
+        selections = [0] * n
+
+        def search(i, risk, ret, count, high):
+            if not self._can_complete(i, risk, ret, count, high):
+                return
+            if i == n:
+                if self.is_feasible(selections):
+                    yield dict(zip(self.names, selections))
+                return
+            yield from search(i + 1, risk, ret, count, high)
+            selections[i] = 1
+            yield from search(i + 1, risk + self.risks[i], ret + self.returns[i],
+                              count + 1, high + self.high[i])
+            selections[i] = 0
+
+        yield from search(0, 0, 0, 0, 0)
+
+    def iter_best(self, k=None, check=None):
+        """Yield feasible assignments in descending ``return - risk`` order
+
+        Best-first branch and bound: partial assignments are expanded in
+        order of an optimistic bound (current score plus the best positive
+        scores that still fit under the count cap), so a complete assignment
+        is only popped once nothing left can beat it. Equal scores come out
+        by smallest mask (bit i = strategy i), as in top_k's bitmask path:
+        partial bounds get ``_EPS`` slack and rank before complete
+        assignments with the same key, so every tie is complete before the
+        first of it is yielded. Work and heap size grow with the number of
+        results requested, not with the size of the feasible set. Stops
+        after ``k`` results when ``k`` is given. ``check()`` is called
+        every ``CHECK_EVERY`` expansions and may raise to abandon the
+        search (e.g. on cancellation).
+        """
+        n = len(self.strategies)
+        if k is not None and k <= 0:
+            return
+        tie = _counter()
+        # Heap entries: (-bound, complete, mask or tiebreak, index, risk, return, count, high, mask)
+        heap = [(-self._best_score[0][min(self.max_count, n)] - _EPS, 0, next(tie), 0, 0, 0, 0, 0, 0)]
+        produced = popped = 0
+        while heap:
+            _, _, _, i, risk, ret, count, high, mask = heapq.heappop(heap)
+            popped += 1
+            if check is not None and popped % CHECK_EVERY == 0:
+                check()
+            if i == n:
+                selections = [(mask >> j) & 1 for j in range(n)]
+                if self.is_feasible(selections):
+                    yield dict(zip(self.names, selections))
+                    produced += 1
+                    if k is not None and produced >= k:
+                        return
+                continue
+            children = ((risk, ret, count, high, mask),
+                        (risk + self.risks[i], ret + self.returns[i], count + 1,
+                         high + self.high[i], mask | (1 << i)))
+            for c_risk, c_ret, c_count, c_high, c_mask in children:
+                if not self._can_complete(i + 1, c_risk, c_ret, c_count, c_high):
+                    continue
+                if i + 1 == n:
+                    # Exact score (same summation order as subset_totals)
+                    key = (-(c_ret - c_risk), 1, c_mask)
+                else:
+                    picks_left = min(self.max_count - c_count, n - i - 1)
+                    key = (-(c_ret - c_risk + self._best_score[i + 1][picks_left]) - _EPS, 0,
+                           next(tie))
+                heapq.heappush(heap, key + (i + 1, c_risk, c_ret, c_count, c_high, c_mask))
+
+    def iter_bitmask_chunks(self, chunk_size=1 << 20):
+        """Evaluate all 2**n subsets in chunks, yielding the feasible ones
+
+        Yields ``(masks, total_return, total_risk)`` for the feasible subsets
+        of each chunk; see ``subset_totals`` for the encoding.
+        """
+        for masks, total_return, total_risk, count, n_high in subset_totals(
+                self.returns, self.risks, self.high, chunk_size):
+            feasible = ((total_risk <= self.max_risk) &
+                        (total_return >= self.min_return) &
+                        (count >= 1) & (count <= self.max_count) &
+                        (n_high >= count * self.ratio))
+            yield masks[feasible], total_return[feasible], total_risk[feasible]
+
+    def _mask_to_solution(self, mask):
+        return {name: (int(mask) >> i) & 1 for i, name in enumerate(self.names)}
+
+    def _use_bitmask(self, method):
+        if method == 'auto':
+            return len(self.strategies) <= BITMASK_MAX_STRATEGIES
+        if method not in ('bitmask', 'branch_and_bound'):
+            raise ValueError(f"Unknown method: {method}")
+        return method == 'bitmask'
+
+    def get_solutions(self, method='auto'):
+        """All feasible assignments (same set python-constraint would return)
+
+        ``method`` is 'bitmask' (vectorized exhaustive evaluation),
+        'branch_and_bound', or 'auto' to use bitmasks for small strategy sets.
+        """
+        if not self._use_bitmask(method):
+            return list(self.iter_solutions())
+        return [self._mask_to_solution(mask)
+                for masks, _, _ in self.iter_bitmask_chunks()
+                for mask in masks]
+
+    def top_k(self, k, method='auto', check=None):
+        """The ``k`` best feasible assignments by ``return - risk``, best first
+
+        ``check()`` (see iter_best) is also called once per bitmask chunk.
+        """
+        if not self._use_bitmask(method):
+            return list(self.iter_best(k, check))
+
+        best_masks = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0)
+        for masks, total_return, total_risk in self.iter_bitmask_chunks():
+            if check is not None:
+                check()
+            best_masks = np.concatenate((best_masks, masks))
+            best_scores = np.concatenate((best_scores, total_return - total_risk))
+            keep = best_k(best_scores, best_masks, k)
+            best_masks, best_scores = best_masks[keep], best_scores[keep]
+        return [self._mask_to_solution(mask) for mask in best_masks]
+
+    def portfolio(self, solution):
+        """Summarize a ``{name: 0/1}`` assignment the way the GUI reports it"""
+        chosen = [s for s in self.strategies if solution.get(s["name"])]
+        return {
+            "strategies": [s["name"] for s in chosen],
+            "total_return": sum(s["return"] for s in chosen),
+            "total_risk": sum(s["risk"] for s in chosen),
+            "liquidity_score": sum(LIQUIDITY_SCORES.get(s["liquidity"], 1) for s in chosen),
+        }
@@ -0,0 +1,172 @@
+# regime.py - Online market-regime tracking on top of a fitted GaussianHMM
+import copy
+from collections import deque
+
+import numpy as np
+
+STATE_NAMES = ['Bearish', 'Neutral', 'Bullish']
+
+
+def regime_names(n_states):
+    """Display names for regimes ordered from most bearish to most bullish"""
+    if n_states == len(STATE_NAMES):
+        return list(STATE_NAMES)
+    if n_states == 1:
+        return ['Neutral']
+    middle = [f'Neutral {i}' for i in range(1, n_states - 1)]
+    return ['Bearish'] + middle + ['Bullish']
+
+
+def regime_kind(regime, n_states):
+    """Collapse a regime index to 'Bearish', 'Neutral' or 'Bullish'"""
+    if n_states > 1 and regime == 0:
+        return 'Bearish'
+    if n_states > 1 and regime == n_states - 1:
+        return 'Bullish'
+    return 'Neutral'
+
+
+def neutral_regime(n_states):
+    """Index of the middle ('Neutral') regime, or None when there is none (K=2)"""
+    middle = n_states // 2
+    return middle if regime_kind(middle, n_states) == 'Neutral' else None
+
+
+def full_covariances(model):
+    """Per-state covariance matrices (K, D, D) for any covariance_type"""
+    n_states = model.n_components
+    n_features = model.means_.shape[1]
+    covars = np.asarray(model._covars_, dtype=np.float64)
+    if model.covariance_type == 'full':
+        return covars
+    if model.covariance_type == 'tied':
+        return np.broadcast_to(covars, (n_states, n_features, n_features)).copy()
+    if model.covariance_type == 'spherical':
+        # Fitted spherical models may hold one variance per feature; all equal
+        covars = np.repeat(covars.reshape(n_states, -1)[:, :1], n_features, axis=1)
+    return covars[:, :, None] * np.eye(n_features)
+
+
+def regime_order(model):
+    """HMM state indices sorted from most bearish to most bullish (by mean return)"""
+    return np.argsort(model.means_[:, 0], kind='stable')
+
+
+def regime_ranks(model):
+    """Map raw HMM state index -> regime index (0 = Bearish ... K-1 = Bullish)"""
+    order = regime_order(model)
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+class OnlineRegimeFilter:
+    """Forward filter that updates P(regime | bars so far) one bar at a time
+
+    Each ``update`` costs one K x K vector-matrix product plus K Gaussian
+    log-densities, so the current regime is available without refitting.
+    With ``refit_every`` set, the model is re-estimated every that many bars
+    by a few EM iterations warm-started from the current parameters on the
+    most recent ``window`` observations.
+    """
+
+    def __init__(self, model, refit_every=None, window=500, refit_iter=10):
+        self.model = copy.deepcopy(model)
+        self.refit_every = refit_every
+        self.refit_iter = refit_iter
+        self.history = deque(maxlen=window)
+        self.n_updates = 0
+        self._posterior = None
+        self._set_parameters()
+
+    def _set_parameters(self):
+        model = self.model
+        covars = full_covariances(model)
+        n_features = covars.shape[1]
+        self._means = np.asarray(model.means_, dtype=np.float64)
+        self._precisions = np.linalg.inv(covars)
+        _, logdet = np.linalg.slogdet(covars)
+        self._log_norm = -0.5 * (n_features * np.log(2 * np.pi) + logdet)
+        self._transmat = np.asarray(model.transmat_, dtype=np.float64)
+        self._startprob = np.asarray(model.startprob_, dtype=np.float64)
+        self._ranks = regime_ranks(model)
+
+    def _log_emissions(self, X):
+        """Per-state Gaussian log-densities for observations X of shape (T, D)"""
+        diff = X[:, None, :] - self._means[None, :, :]
+        maha = np.einsum('tkd,kde,tke->tk', diff, self._precisions, diff)
+        return self._log_norm - 0.5 * maha
+
+    def _step(self, log_emission):
+        prior = self._startprob if self._posterior is None else self._posterior @ self._transmat
+        posterior = prior * np.exp(log_emission - log_emission.max())
+        total = posterior.sum()
+        self._posterior = posterior / total if total > 0 else prior
+
+    def _filter(self, X):
+        self._posterior = None
+        for log_emission in self._log_emissions(X):
+            self._step(log_emission)
+
+    def prime(self, X):
+        """Run the filter over a history of observations (rows of X)"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        self._filter(X)
+        self.history.extend(X)
+        return self
+
+    def update(self, x):
+        """Incorporate one new observation and return the current regime index"""
+        x = np.asarray(x, dtype=np.float64).reshape(1, -1)
+        self._step(self._log_emissions(x)[0])
+        self.history.append(x[0])
+        self.n_updates += 1
+        if self.refit_every and self.n_updates % self.refit_every == 0:
+            self.refit()
+        return self.regime
+
+    def refit(self):
+        """Warm-started EM on the recent window, then re-filter that window"""
+        if len(self.history) < 10 * self.model.n_components:
+            return self
+        X = np.asarray(self.history)
+        model = copy.deepcopy(self.model)
+        model.init_params = ''
+        model.n_iter = self.refit_iter
+        try:
+            model.fit(X)
+        except (ValueError, np.linalg.LinAlgError):
+            # Degenerate window: keep filtering with the previous parameters
+            return self
+        self.model = model
+        self._set_parameters()
+        self._filter(X)
+        return self
+
+    def to_regimes(self, states):
+        """Translate raw HMM state indices to regime indices"""
+        return self._ranks[np.asarray(states)]
+
+    @property
+    def posterior(self):
+        """P(regime | data) ordered Bearish ... Bullish"""
+        if self._posterior is None:
+            return None
+        ordered = np.empty_like(self._posterior)
+        ordered[self._ranks] = self._posterior
+        return ordered
+
+    @property
+    def state(self):
+        """Most probable raw HMM state"""
+        return None if self._posterior is None else int(np.argmax(self._posterior))
+
+    @property
+    def regime(self):
+        """Most probable regime index (0 = Bearish ... K-1 = Bullish)"""
+        return None if self._posterior is None else int(self._ranks[np.argmax(self._posterior)])
+
+    @property
+    def label(self):
+        regime = self.regime
+        return None if regime is None else regime_names(len(self._ranks))[regime]
@@ -0,0 +1,8 @@
+# strategy_scoring.py - Default strategy constraints (filtering/scoring: strategy_store)
+DEFAULT_CONSTRAINTS = {
+    'max_risk': 0.5,
+    'min_return': 0.08,
+    'max_transaction_cost': 0.03,
+    'liquidity': 'Medium'
+}
+
@@ -0,0 +1,110 @@
+# strategy_store.py - Columnar strategy attributes with vectorized filtering and scoring
+import numpy as np
+
+from correlation_graph import LIQUIDITY_LEVELS, SparseStrategyGraph
+
+MARKETS = ('Bearish', 'Neutral', 'Bullish')
+HIGH_LIQUIDITY = LIQUIDITY_LEVELS.index('High')
+
+
+class StrategyRecord:
+    """One strategy's attributes; also readable as ``record['expected_return']``"""
+    __slots__ = ('name', 'expected_return', 'max_risk', 'liquidity')
+
+    def __init__(self, name, expected_return, max_risk, liquidity):
+        self.name = name
+        self.expected_return = expected_return
+        self.max_risk = max_risk
+        self.liquidity = liquidity
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __repr__(self):
+        return (f"StrategyRecord({self.name!r}, expected_return={self.expected_return}, "
+                f"max_risk={self.max_risk}, liquidity={self.liquidity!r})")
+
+
+class StrategyStore:
+    """Strategy attributes as NumPy columns
+
+    ``liquidity`` is an int8 code into ``LIQUIDITY_LEVELS`` (Low=0 ..
+    High=2). Constraint checks and regime scores are array expressions
+    over all strategies; ranking partially selects the ``top_n`` before a
+    stable argsort of just those.
+    """
+
+    def __init__(self, names, expected_return, max_risk, liquidity):
+        self.names = np.asarray(names, dtype=object)
+        self.expected_return = np.asarray(expected_return, dtype=np.float64)
+        self.max_risk = np.asarray(max_risk, dtype=np.float64)
+        liquidity = np.asarray(liquidity)
+        if liquidity.dtype.kind in 'OUS':
+            liquidity = np.array([LIQUIDITY_LEVELS.index(level) for level in liquidity])
+        self.liquidity = liquidity.astype(np.int8)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Columns from a SparseStrategyGraph or an nx graph's node attributes"""
+        if isinstance(graph, SparseStrategyGraph):
+            return cls(graph.nodes, graph.expected_return, graph.max_risk, graph.liquidity)
+        nodes = list(graph.nodes(data=True))
+        return cls([node for node, _ in nodes],
+                   [data['expected_return'] for _, data in nodes],
+                   [data['max_risk'] for _, data in nodes],
+                   [data['liquidity'] for _, data in nodes])
+
+    def __len__(self):
+        return len(self.names)
+
+    def record(self, i):
+        return StrategyRecord(self.names[i], float(self.expected_return[i]),
+                              float(self.max_risk[i]), LIQUIDITY_LEVELS[self.liquidity[i]])
+
+    def feasible_mask(self, constraints):
+        """Risk <= max_risk, return >= min_return, liquidity as required or High"""
+        required = LIQUIDITY_LEVELS.index(constraints['liquidity'])
+        return ((self.max_risk <= constraints['max_risk']) &
+                (self.expected_return >= constraints['min_return']) &
+                ((self.liquidity == required) | (self.liquidity == HIGH_LIQUIDITY)))
+
+    def scores(self, market):
+        """Score for a 'Bearish', 'Neutral' or 'Bullish' market"""
+        if market == 'Bearish':
+            return self.expected_return - self.max_risk
+        if market == 'Bullish':
+            return self.expected_return
+        return (self.expected_return + (1 - self.max_risk)) / 2
+
+    @staticmethod
+    def _best_first(candidates, scores, top_n):
+        if top_n is not None and top_n < len(candidates):
+            # every score tied with the top_n-th one survives, so the stable
+            # sort below still breaks ties at the cut-off by store order
+            kth = -np.partition(-scores, top_n - 1)[top_n - 1]
+            keep = np.flatnonzero(scores >= kth)
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        return candidates[order], scores[order]
+
+    def rank(self, market, constraints, top_n=None):
+        """Indices and scores of feasible strategies, best first
+
+        Ties keep store order, also at the ``top_n`` cut-off.
+        """
+        candidates = np.flatnonzero(self.feasible_mask(constraints))
+        return self._best_first(candidates, self.scores(market)[candidates], top_n)
+
+    def rank_all(self, constraints, top_n=None):
+        """``{market: (indices, scores)}`` for all three regimes (one shared mask)"""
+        candidates = np.flatnonzero(self.feasible_mask(constraints))
+        return {market: self._best_first(candidates, self.scores(market)[candidates], top_n)
+                for market in MARKETS}
+
+    def ranked(self, market, constraints, top_n=None):
+        """``(name, score, record)`` tuples, best first (the optimizer's ranking format)"""
+        index, scores = self.rank(market, constraints, top_n)
+        return [(self.names[i], float(score), self.record(i)) for i, score in zip(index, scores)]
@@ -0,0 +1,83 @@
+# streaming_stats.py - One-pass, mergeable summary statistics
+import numpy as np
+
+
+class RunningStats:
+    """Count/mean/variance/min/max accumulated chunk by chunk
+
+    Chunks are reduced with NumPy and combined with the pairwise update of
+    Chan et al. (the batched form of Welford's algorithm), so the result is
+    numerically stable and independent of how the input was split.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Fold an array of observations into the running statistics"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return self
+        mean = values.mean()
+        m2 = np.square(values - mean).sum()
+        self._combine(n, mean, m2, values.min(), values.max())
+        return self
+
+    def merge(self, other):
+        """Fold another RunningStats (e.g. from a different chunk) into this one"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def _combine(self, n, mean, m2, lo, hi):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    def variance(self, ddof=1):
+        if self.count - ddof <= 0:
+            return np.nan
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.variance(ddof))
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else np.nan,
+            'variance': self.variance(),
+            'std': self.std(),
+            'min': self.min if self.count else np.nan,
+            'max': self.max if self.count else np.nan,
+        }
+
+
+def summarize_chunks(chunks):
+    """Accumulate per-column RunningStats over an iterable of DataFrames
+
+    Returns ``(stats, n_rows, columns)`` where ``stats`` maps each numeric
+    column (in first-seen order) to its RunningStats.
+    """
+    stats = {}
+    n_rows = 0
+    columns = None
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+        n_rows += len(chunk)
+        for col in chunk.select_dtypes(include=[np.number]).columns:
+            stats.setdefault(col, RunningStats()).update(chunk[col].to_numpy())
+    return stats, n_rows, columns or []
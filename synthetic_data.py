@@ -0,0 +1,227 @@
+# synthetic_data.py - Seeded, vectorized regime-switching OHLCV generator
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_cache import CacheWriter
+from regime import full_covariances, regime_order
+
+# Daily log-return mean/volatility per regime (Bearish, Neutral, Bullish)
+DEFAULT_REGIMES = {
+    'startprob': np.array([0.2, 0.5, 0.3]),
+    'transmat': np.array([[0.95, 0.04, 0.01],
+                          [0.02, 0.95, 0.03],
+                          [0.01, 0.03, 0.96]]),
+    'means': np.array([-0.0015, 0.0002, 0.0010]),
+    'vols': np.array([0.025, 0.012, 0.009]),
+}
+
+COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'Ticker']
+
+
+def regime_params_from_hmm(model, feature=0):
+    """Regime dynamics from a fitted GaussianHMM, states ordered bearish first
+
+    Uses the model's transition matrix and the mean/standard deviation of
+    observation column ``feature`` (the return feature).
+    """
+    order = regime_order(model)
+    transmat = model.transmat_[np.ix_(order, order)]
+    return {
+        'startprob': model.startprob_[order],
+        'transmat': transmat / transmat.sum(axis=1, keepdims=True),
+        'means': model.means_[order, feature],
+        'vols': np.sqrt(full_covariances(model)[order, feature, feature]),
+    }
+
+
+def _cumulative(transmat):
+    cumulative = np.cumsum(transmat, axis=1)
+    cumulative[:, -1] = 1.0  # so a uniform draw always lands in some state
+    return cumulative
+
+
+# Above this many states the K**K x K**K map composition table gets too big
+_TABLE_MAX_STATES = 5
+
+
+def _map_table(n_states):
+    """All maps {0..K-1} -> {0..K-1} (code = sum f[k] * K**k) and their compositions"""
+    codes = np.arange(n_states ** n_states)
+    maps = (codes[:, None] // n_states ** np.arange(n_states)) % n_states  # (codes, K)
+    # compose[a, b] = code of x -> a[b[x]]
+    composed = np.take_along_axis(maps[:, None, :].repeat(len(codes), axis=1),
+                                  np.broadcast_to(maps[None, :, :], (len(codes),) + maps.shape),
+                                  axis=2)
+    compose = (composed * n_states ** np.arange(n_states)).sum(axis=2)
+    return maps, compose.astype(np.int16 if len(codes) > 256 else np.uint8)
+
+
+def simulate_regimes(rng, n_tickers, n_bars, transmat, initial):
+    """Markov chain paths (n_tickers, n_bars) without a Python loop over time
+
+    Each step's uniform draw defines a map state -> next state; the maps are
+    composed with a prefix scan (log2(n_bars) vectorized rounds) and
+    applied to the initial states. Maps are encoded as integers and
+    composed through a lookup table for up to 5 states.
+    """
+    n_states = len(transmat)
+    cumulative = _cumulative(transmat)
+    u = rng.random((n_tickers, n_bars))
+
+    if n_states > _TABLE_MAX_STATES:
+        # maps[..., t, k]: state at t when the state at t - 1 is k
+        maps = (u[:, :, None, None] >= cumulative[None, None, :, :]).sum(axis=3).astype(np.int8)
+        maps[:, 0] = initial[:, None]
+        offset = 1
+        while offset < n_bars:
+            maps[:, offset:] = np.take_along_axis(maps[:, offset:],
+                                                  maps[:, :-offset].astype(np.intp), axis=2)
+            offset *= 2
+        return maps[:, :, 0]
+
+    # The step map is a step function of u with breakpoints at the cumulative probabilities
+    breaks = np.unique(cumulative)
+    maps_at = (np.concatenate(([0.0], breaks))[:, None, None] >= cumulative[None]).sum(axis=2)
+    weights = n_states ** np.arange(n_states)
+    code_at = (maps_at * weights).sum(axis=1)
+    _, compose = _map_table(n_states)
+    codes = code_at[np.searchsorted(breaks, u, side='right')].astype(compose.dtype)
+    codes[:, 0] = initial * weights.sum()  # constant map to the initial state
+    offset = 1
+    while offset < n_bars:
+        codes[:, offset:] = compose[codes[:, offset:], codes[:, :-offset]]
+        offset *= 2
+    return (codes % n_states).astype(np.int8)
+
+
+def _chunk_bars(rng, params, n_tickers, n_bars, states, last_close, base_volume):
+    """OHLCV arrays (n_tickers, n_bars) continuing from ``last_close``"""
+    means, vols = params['means'][states], params['vols'][states]
+    log_return = means + vols * rng.standard_normal((n_tickers, n_bars))
+    close = last_close[:, None] * np.exp(np.cumsum(log_return, axis=1))
+    previous = np.concatenate((last_close[:, None], close[:, :-1]), axis=1)
+    # Overnight gap, then intraday extremes beyond both open and close
+    open_ = previous * np.exp(0.25 * vols * rng.standard_normal((n_tickers, n_bars)))
+    high = np.maximum(open_, close) * np.exp(0.5 * vols * np.abs(rng.standard_normal((n_tickers, n_bars))))
+    low = np.minimum(open_, close) * np.exp(-0.5 * vols * np.abs(rng.standard_normal((n_tickers, n_bars))))
+    # Volume rises with the size of the move relative to the regime volatility
+    volume = base_volume[:, None] * np.exp(0.3 * rng.standard_normal((n_tickers, n_bars)))
+    volume *= 1 + np.abs(log_return) / vols
+    return open_, high, low, close, volume.astype(np.int64)
+
+
+def _dates(start, n_bars, freq):
+    """Bar timestamps; 'B' (business days) and fixed frequencies ('D', 'h', 'min', ...)"""
+    if freq == 'B':
+        dates = np.busday_offset(np.datetime64(pd.Timestamp(start).date()), np.arange(n_bars),
+                                 roll='forward')
+    else:
+        step = np.timedelta64(pd.tseries.frequencies.to_offset(freq).nanos, 'ns')
+        dates = np.datetime64(pd.Timestamp(start).to_datetime64(), 'ns') + np.arange(n_bars) * step
+    if n_bars and dates[-1] > np.datetime64(pd.Timestamp.max):
+        raise ValueError(f"{n_bars} bars at freq '{freq}' run past {pd.Timestamp.max.date()}; "
+                         f"use a finer freq")
+    return dates.astype('datetime64[ns]')
+
+
+def iter_market_chunks(n_tickers, n_bars, seed=0, params=None, start='2018-01-01', freq='B',
+                       start_price=100.0, chunk_bars=None, ticker_prefix='SYN'):
+    """Yield date-major DataFrame chunks of a synthetic multi-ticker market
+
+    Rows are ordered by date, then ticker, with the dataset's columns
+    (Date, Open, High, Low, Close, Adj Close, Volume, Ticker). Every bar has
+    Low <= min(Open, Close) <= max(Open, Close) <= High and positive prices.
+    The same ``seed``, sizes and ``chunk_bars`` always give the same data.
+    """
+    params = DEFAULT_REGIMES if params is None else params
+    params = {key: np.asarray(value, dtype=np.float64) for key, value in params.items()}
+    chunk_bars = n_bars if chunk_bars is None else chunk_bars
+    rng = np.random.default_rng(seed)
+    dates = _dates(start, n_bars, freq)
+    width = max(4, len(str(n_tickers - 1)))
+    tickers = [f"{ticker_prefix}{i:0{width}d}" for i in range(n_tickers)]
+    ticker_codes = np.arange(n_tickers, dtype=np.int32)
+
+    startprob = params['startprob'] / params['startprob'].sum()
+    state = rng.choice(len(startprob), size=n_tickers, p=startprob)
+    last_close = np.full(n_tickers, float(start_price))
+    base_volume = 10 ** rng.uniform(5, 8, n_tickers)
+
+    for begin in range(0, n_bars, chunk_bars):
+        m = min(chunk_bars, n_bars - begin)
+        # The chunk's first state is one transition on from the previous chunk's last
+        if begin:
+            step = rng.random(n_tickers)
+            state = (step[:, None] >= _cumulative(params['transmat'])[state]).sum(axis=1)
+        states = simulate_regimes(rng, n_tickers, m, params['transmat'], state)
+        open_, high, low, close, volume = _chunk_bars(rng, params, n_tickers, m, states,
+                                                      last_close, base_volume)
+        state, last_close = states[:, -1], close[:, -1]
+
+        close_t = close.T.ravel()
+        yield pd.DataFrame({
+            'Date': np.repeat(dates[begin:begin + m], n_tickers),
+            'Open': open_.T.ravel(),
+            'High': high.T.ravel(),
+            'Low': low.T.ravel(),
+            'Close': close_t,
+            'Adj Close': close_t,
+            'Volume': volume.T.ravel(),
+            'Ticker': pd.Categorical.from_codes(np.tile(ticker_codes, m), categories=tickers),
+        }, columns=COLUMNS)
+
+
+def generate_market(n_tickers=1, n_bars=1000, seed=0, params=None, **kwargs):
+    """The whole synthetic market as one DataFrame (see iter_market_chunks)"""
+    return pd.concat(iter_market_chunks(n_tickers, n_bars, seed, params, **kwargs),
+                     ignore_index=True)
+
+
+def write_market(path, n_tickers, n_bars, seed=0, params=None, csv=True, cache=True,
+                 rows_per_chunk=1_000_000, **kwargs):
+    """Generate straight to disk as CSV and/or the columnar cache
+
+    Memory stays bounded by ``rows_per_chunk``. With ``csv=False`` only a
+    standalone cache is written, which ``data_cache.load_dataset(path)``
+    loads as long as no file exists at ``path`` (an existing one is
+    refused rather than shadowed).
+    """
+    if cache and not csv and os.path.exists(path):
+        raise FileExistsError(f"'{path}' exists; a cache-only market would not match it")
+    chunk_bars = max(1, rows_per_chunk // n_tickers)
+    # Daily bars are written as plain dates, like the downloaded dataset
+    date_format = '%Y-%m-%d' if kwargs.get('freq', 'B') in ('B', 'D') else None
+    writer = CacheWriter(path, n_tickers * n_bars, standalone=not csv) if cache else None
+    for i, chunk in enumerate(iter_market_chunks(n_tickers, n_bars, seed, params,
+                                                 chunk_bars=chunk_bars, **kwargs)):
+        if csv:
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False,
+                         date_format=date_format)
+        if writer is not None:
+            writer.append(chunk)
+    if writer is not None:
+        writer.close()
+    return path
+
+
+def main():
+    # usage: python synthetic_data.py OUT.csv N_TICKERS N_BARS [SEED] [--cache-only]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    path = args[0] if args else 'synthetic_market.csv'
+    n_tickers = int(args[1]) if len(args) > 1 else 10
+    n_bars = int(args[2]) if len(args) > 2 else 1000
+    seed = int(args[3]) if len(args) > 3 else 0
+    cache_only = '--cache-only' in sys.argv
+
+    print(f"🧪 Generating {n_tickers} tickers x {n_bars} bars (seed {seed})...")
+    start = time.perf_counter()
+    write_market(path, n_tickers, n_bars, seed=seed, csv=not cache_only)
+    print(f"✅ {n_tickers * n_bars:,} rows written to '{path}' in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()